@@ -1,6 +1,9 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from features.proxy_pool.interface.api import router as proxy_router
 from features.proxy_pool.application import services
+from features.proxy_pool.infrastructure import metrics
+from features.proxy_pool.infrastructure.redis_state import redis_client
 
 app = FastAPI(title="airProxyPool API", version="0.1.0")
 
@@ -12,4 +15,11 @@ def _startup():
 def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    # Worker processes push their samples to Redis; merge them so one scrape covers both roles.
+    pushed = metrics.pulled_from_redis(redis_client())
+    body = metrics.render(metrics.REGISTRY.collect(), pushed, labels={"source": metrics.source("api")})
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 app.include_router(proxy_router, prefix="/api")
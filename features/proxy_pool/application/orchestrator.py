@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
-from typing import List
+from typing import List, Sequence
 
-from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.domain.models import Proxy, ProxyView, UpsertResult
 
 from .ports import (
     ProxyCollector,
@@ -18,6 +19,8 @@ class ProxyPoolRefreshResult:
     collected: int
     stored: int
     published: int
+    inserted: int = 0
+    updated: int = 0
 
 
 class ProxyPoolOrchestrator:
@@ -38,13 +41,15 @@ class ProxyPoolOrchestrator:
     def refresh_pool(self) -> ProxyPoolRefreshResult:
         """Collect, persist, evaluate, and publish proxies in a single pass."""
         collected_proxies = self._collector.collect()
-        stored_count = self._persist(collected_proxies)
+        stored = self._persist(collected_proxies)
         evaluated = self._health_service.evaluate()
         published_count = self._publish(evaluated)
         return ProxyPoolRefreshResult(
             collected=len(collected_proxies),
-            stored=stored_count,
+            stored=stored.total,
             published=published_count,
+            inserted=stored.inserted,
+            updated=stored.updated,
         )
 
     def perform_maintenance(self) -> int:
@@ -53,7 +58,7 @@ class ProxyPoolOrchestrator:
         self._publish(evaluated)
         return len(evaluated)
 
-    def _persist(self, proxies: List[Proxy]) -> int:
+    def _persist(self, proxies: List[Proxy]) -> UpsertResult:
         store = self._store_factory()
         try:
             return store.upsert_many(proxies)
@@ -63,3 +68,18 @@ class ProxyPoolOrchestrator:
     def _publish(self, proxies: List[Proxy]) -> int:
         self._publisher.publish(proxies)
         return len(proxies)
+
+
+class CompositeProxyPublisher(ProxyPublisher):
+    """Fans a published listing out to several publishers; one failing does not block the rest."""
+
+    def __init__(self, publishers: Sequence[ProxyPublisher]) -> None:
+        self._publishers = list(publishers)
+        self._logger = logging.getLogger(__name__)
+
+    def publish(self, proxies: List[ProxyView]) -> None:
+        for publisher in self._publishers:
+            try:
+                publisher.publish(proxies)
+            except Exception:  # pylint: disable=broad-except
+                self._logger.exception("Publisher %s failed", type(publisher).__name__)
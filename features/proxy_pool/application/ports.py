@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Protocol, Sequence, Callable, Optional
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Protocol, Sequence, Callable, Optional, Tuple
 
 from features.proxy_pool.domain.subscriptions import (
     FetchedContent,
@@ -9,7 +10,17 @@ from features.proxy_pool.domain.subscriptions import (
     SchedulerConfig,
     SyncResult,
 )
-from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.domain.models import (
+    EvictionPolicy,
+    EvictionResult,
+    PoolDelta,
+    ProbeCompaction,
+    ProbeRetention,
+    Proxy,
+    ProxyRecord,
+    ProxyView,
+    UpsertResult,
+)
 
 
 class SubscriptionFetcher(Protocol):
@@ -69,18 +80,18 @@ class ProxyCollector(Protocol):
 
 
 class ProxyHealthService(Protocol):
-    def evaluate(self) -> List[Proxy]:
+    def evaluate(self) -> List[ProxyView]:
         """Recalculate health metrics for stored proxies and return prioritized listing."""
 
 
 class ProxyPublisher(Protocol):
-    def publish(self, proxies: List[Proxy]) -> None:
+    def publish(self, proxies: List[ProxyView]) -> None:
         """Publish processed proxies to downstream consumers such as glider."""
 
 
 class ProxyStore(Protocol):
-    def upsert_many(self, proxies: Sequence[Proxy]) -> int:
-        """Persist or update proxies."""
+    def upsert_many(self, proxies: Sequence[Proxy]) -> UpsertResult:
+        """Persist or update proxies, reporting how many were new versus already stored."""
 
     def close(self) -> None:
         """Release underlying resources."""
@@ -88,8 +99,54 @@ class ProxyStore(Protocol):
     def list(self, min_score: float = 0.0, limit: int = 200) -> List[Proxy]:
         """Retrieve proxies ordered by score."""
 
+    def list_records(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        cursor: Optional[Tuple[float, int]] = None,
+    ) -> List[ProxyRecord]:
+        """Read-only variant of ``list``/``list_after`` returning lightweight tuple records."""
+
+    def list_after(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        cursor: Optional[Tuple[float, int]] = None,
+    ) -> List[Proxy]:
+        """Retrieve the page of proxies that follows the ``(score, id)`` cursor."""
+
+    def list_stale(self, checked_before: datetime, limit: int = 200) -> List[Proxy]:
+        """Retrieve proxies never checked or last checked before ``checked_before``, oldest first."""
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Return the number of stored proxies per status."""
+
+    def iter_all(self, min_score: float = 0.0, batch_size: int = 1000) -> Iterator[Proxy]:
+        """Stream every proxy ordered by score without materialising the table."""
+
+    def claim_for_probe(self, limit: int, checked_before: datetime, lease_seconds: float = 600.0) -> List[Proxy]:
+        """Lease proxies due for probing so concurrent health workers never probe the same row."""
+
     def update_health(self, uri: str, ok: bool, latency_ms: Optional[float]) -> None:
         """Persist health metrics for a single proxy."""
 
+    def record_health_batch(self, results: Sequence[Tuple[str, bool, Optional[float]]]) -> int:
+        """Persist ``(uri, ok, latency_ms)`` probe results in one transaction."""
+
+    def compact_probes(self, retention: ProbeRetention, now: Optional[datetime] = None) -> ProbeCompaction:
+        """Roll probe history up into hourly/daily aggregates and expire rows past ``retention``."""
+
+    def evict_dead(self, policy: EvictionPolicy, now: Optional[datetime] = None) -> EvictionResult:
+        """Archive proxies that match the dead-proxy ``policy`` and reclaim their space."""
+
+    def changes_since(self, since: int) -> Optional[PoolDelta]:
+        """Net added/removed/rescored proxies after generation ``since``; ``None`` once pruned."""
+
+    def prune_changes(self, keep_generations: int) -> int:
+        """Drop change-log rows older than the last ``keep_generations`` generations."""
+
+    def generation(self) -> int:
+        """Return the pool generation, bumped on every committed write."""
+
 
 ProxyStoreFactory = Callable[[], ProxyStore]
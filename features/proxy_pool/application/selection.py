@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import random
+from bisect import bisect_left
+from typing import List, Sequence
+
+from features.proxy_pool.domain.models import ProxyView
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class WeightedHashRing:
+    """Consistent-hash ring over candidate URIs with virtual nodes proportional to score.
+
+    Points are derived from each proxy's URI, so adding or dropping a proxy only moves the keys
+    that land on that proxy's arcs; every other key keeps its upstream. Construction is
+    O(n * vnodes log(n * vnodes)) once per snapshot, each pick is a single bisect.
+    """
+
+    def __init__(self, candidates: Sequence[ProxyView], vnodes: int = 40) -> None:
+        self._candidates = candidates
+        points = []
+        for idx, proxy in enumerate(candidates):
+            weight = max(0.0, min(100.0, proxy.score)) / 100.0
+            replicas = max(1, int(round(vnodes * weight)))
+            for replica in range(replicas):
+                points.append((_hash64(f"{proxy.uri}#{replica}"), idx))
+        points.sort()
+        self._points: List[int] = [point for point, _ in points]
+        self._owners: List[int] = [owner for _, owner in points]
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def pick(self, key: str) -> ProxyView:
+        pos = bisect_left(self._points, _hash64(key))
+        if pos == len(self._points):
+            pos = 0
+        return self._candidates[self._owners[pos]]
+
+
+def proxy_weight(proxy: ProxyView, score_exponent: float = 1.0, latency_ref_ms: float = 1000.0) -> float:
+    """Relative draw weight: score to ``score_exponent``, halved at ``latency_ref_ms`` of latency."""
+
+    score = max(0.0, min(100.0, proxy.score)) / 100.0
+    latency = proxy.avg_latency_ms if proxy.avg_latency_ms >= 0 else latency_ref_ms
+    return (score ** score_exponent) * latency_ref_ms / (latency_ref_ms + latency)
+
+
+class AliasTable:
+    """Walker/Vose alias table for O(1) weighted draws over a fixed candidate list."""
+
+    def __init__(self, candidates: Sequence[ProxyView], weights: Sequence[float]) -> None:
+        self._candidates = candidates
+        n = len(candidates)
+        total = float(sum(weights))
+        if n == 0 or total <= 0.0:
+            # Degenerate weights fall back to a uniform draw instead of an empty table.
+            weights = [1.0] * n
+            total = float(n)
+        self._weights = list(weights)
+        scaled = [w * n / total for w in weights]
+        self._prob: List[float] = [1.0] * n
+        self._alias: List[int] = list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            lo = small.pop()
+            hi = large.pop()
+            self._prob[lo] = scaled[lo]
+            self._alias[lo] = hi
+            scaled[hi] = scaled[hi] + scaled[lo] - 1.0
+            (small if scaled[hi] < 1.0 else large).append(hi)
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def draw(self, u1: float, u2: float) -> ProxyView:
+        """Map two uniforms in ``[0, 1)`` to a candidate."""
+
+        column = min(int(u1 * len(self._candidates)), len(self._candidates) - 1)
+        if u2 < self._prob[column]:
+            return self._candidates[column]
+        return self._candidates[self._alias[column]]
+
+    def pick(self, key: str) -> ProxyView:
+        """Deterministic draw for ``key`` so a rotation step keeps the same upstream."""
+
+        h = _hash64(key)
+        return self.draw((h >> 32) / 2**32, (h & 0xFFFFFFFF) / 2**32)
+
+    def sample(self, k: int, rng: random.Random) -> List[ProxyView]:
+        """``min(k, len(self))`` distinct candidates, drawn by weight without replacement.
+
+        Draws that keep landing on already chosen candidates give up after ``4 * k`` attempts;
+        the rest of the sample is then filled from the remaining candidates in weight order.
+        """
+
+        k = min(k, len(self._candidates))
+        chosen: List[ProxyView] = []
+        seen: set[str] = set()
+        attempts = 0
+        while len(chosen) < k and attempts < 4 * k:
+            attempts += 1
+            proxy = self.draw(rng.random(), rng.random())
+            if proxy.uri in seen:
+                continue
+            seen.add(proxy.uri)
+            chosen.append(proxy)
+        if len(chosen) < k:
+            order = sorted(range(len(self._candidates)), key=lambda i: -self._weights[i])
+            rest = (self._candidates[i] for i in order if self._candidates[i].uri not in seen)
+            chosen.extend(proxy for _, proxy in zip(range(k - len(chosen)), rest))
+        return chosen
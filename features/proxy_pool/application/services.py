@@ -2,14 +2,44 @@ from __future__ import annotations
 
 import hashlib
 import os
+import random
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-from ..domain.models import Proxy
+from ..domain.models import EvictionResult, PoolDelta, ProbeCompaction, Proxy, ProxyView
+from ..infrastructure.candidate_cache import CandidateCache, CandidateSnapshot
 from ..infrastructure.db import init_db
-from ..infrastructure.repository import ProxyRepository
+from ..infrastructure.metrics import GC_EVICTED, GC_PROBES_SAVED, ROTATE_SECONDS
+from ..infrastructure.repository import ProxyRepository, repository_class
 from ..infrastructure.parser import parse_forwards
-from ..infrastructure.redis_state import incr_token_count
+from ..infrastructure.pool_snapshot import PoolSnapshotPublisher, PoolSnapshotReader
+from ..infrastructure.redis_state import incr_token_count, incr_token_counts
+from ..infrastructure.settings import (
+    eviction_policy,
+    pool_changes_retention,
+    pool_snapshot_limit,
+    pool_snapshot_path,
+    pool_snapshot_ttl,
+    probe_retention,
+    rotate_candidate_limit,
+)
+
+
+_store_class = repository_class()
+_pool_snapshot = PoolSnapshotReader(pool_snapshot_path(), check_interval=pool_snapshot_ttl())
+
+
+def _store_factory() -> ProxyRepository:
+    return _store_class()
+
+
+_candidate_cache = CandidateCache(
+    _store_factory,
+    snapshot_source=_pool_snapshot.current,
+    limit=rotate_candidate_limit(),
+    check_interval=pool_snapshot_ttl(),
+)
+_rng = random.Random()
 
 
 def bootstrap() -> None:
@@ -32,28 +62,126 @@ def upsert_proxies_from_conf() -> int:
     proxies = load_proxies_from_glider_conf(conf_path)
     if not proxies:
         return 0
-    with ProxyRepository() as repo:
-        return repo.upsert_many(proxies)
+    with _store_class() as repo:
+        return repo.upsert_many(proxies).total
+
+
+def compact_probe_history() -> ProbeCompaction:
+    with _store_class() as repo:
+        return repo.compact_probes(probe_retention())
+
+
+def evict_dead_proxies() -> EvictionResult:
+    with _store_class() as repo:
+        result = repo.evict_dead(eviction_policy())
+    snapshot_path = pool_snapshot_path()
+    if result.archived and snapshot_path is not None:
+        # Until the snapshot is rewritten readers fall back to the database, which is slower.
+        PoolSnapshotPublisher(snapshot_path, _store_factory, limit=pool_snapshot_limit()).publish([])
+    GC_EVICTED.inc(result.archived)
+    GC_PROBES_SAVED.set(result.probes_saved_per_cycle)
+    return result
+
+
+def prune_pool_changes() -> int:
+    with _store_class() as repo:
+        return repo.prune_changes(pool_changes_retention())
+
+
+def pool_changes_since(since: int) -> Optional[PoolDelta]:
+    with _store_class() as repo:
+        return repo.changes_since(since)
+
 
+def list_proxies(min_score: float = 0.0, limit: int = 200, strategy: str = "score") -> List[ProxyView]:
+    if strategy == "weighted":
+        # ``limit`` distinct proxies drawn by weight from the rotation candidates, whose alias
+        # table is built once per pool generation.
+        snapshot = _candidate_cache.get(min_score, max(limit, rotate_candidate_limit()))
+        return snapshot.alias.sample(limit, _rng)
+    with _store_class() as repo:
+        return repo.list_records(min_score=min_score, limit=limit)
 
-def list_proxies(min_score: float = 0.0, limit: int = 200) -> List[Proxy]:
-    with ProxyRepository() as repo:
-        return repo.list(min_score=min_score, limit=limit)
 
+def list_proxies_after(
+    min_score: float = 0.0,
+    limit: int = 200,
+    cursor: Optional[Tuple[float, int]] = None,
+) -> List[ProxyView]:
+    with _store_class() as repo:
+        return repo.list_records(min_score=min_score, limit=limit, cursor=cursor)
 
-def _deterministic_pick(candidates: List[Proxy], token: str, rotate_step: int) -> Proxy:
+
+def iter_proxies(min_score: float = 0.0, batch_size: int = 1000) -> Iterator[Proxy]:
+    with _store_class() as repo:
+        yield from repo.iter_all(min_score=min_score, batch_size=batch_size)
+
+
+def candidate_snapshot(min_score: float = 0.0, limit: Optional[int] = None) -> CandidateSnapshot:
+    """Cached score-ordered listing; only re-queried when the pool generation changes."""
+
+    return _candidate_cache.get(min_score, limit)
+
+
+def _deterministic_pick(candidates: Sequence[ProxyView], token: str, rotate_step: int) -> ProxyView:
     key = f"{token}:{rotate_step}".encode("utf-8")
     h = hashlib.sha256(key).digest()
     idx = int.from_bytes(h[:4], "big") % max(1, len(candidates))
     return candidates[idx]
 
 
-def get_rotated_proxy(token: str, rotate_every: int, min_score: float = 20.0) -> Optional[Proxy]:
-    if rotate_every <= 0:
-        rotate_every = 1
-    count = incr_token_count(token)
-    rotate_step = (count - 1) // rotate_every
-    candidates = list_proxies(min_score=min_score, limit=200)
-    if not candidates:
+def _pick(snapshot: CandidateSnapshot, token: str, rotate_step: int, strategy: str) -> Optional[ProxyView]:
+    if not snapshot.candidates:
         return None
-    return _deterministic_pick(candidates, token, rotate_step)
+    if strategy == "consistent":
+        return snapshot.ring.pick(f"{token}:{rotate_step}")
+    if strategy == "weighted":
+        return snapshot.alias.pick(f"{token}:{rotate_step}")
+    return _deterministic_pick(snapshot.candidates, token, rotate_step)
+
+
+def get_rotated_proxy(
+    token: str,
+    rotate_every: int,
+    min_score: float = 20.0,
+    strategy: str = "hash",
+) -> Optional[ProxyView]:
+    """Pick the upstream for ``token``'s current rotation step.
+
+    ``strategy="hash"`` spreads steps uniformly over the candidate list; ``"consistent"`` uses a
+    score-weighted hash ring so a token keeps its proxy across pool changes unless that proxy left;
+    ``"weighted"`` draws from an alias table so faster, higher-scored proxies get more steps.
+    """
+
+    with ROTATE_SECONDS.time(strategy=strategy):
+        if rotate_every <= 0:
+            rotate_every = 1
+        count = incr_token_count(token)
+        rotate_step = (count - 1) // rotate_every
+        return _pick(_candidate_cache.get(min_score), token, rotate_step, strategy)
+
+
+def get_rotated_proxies(
+    entries: Sequence[Tuple[str, int, int]],
+    min_score: float = 20.0,
+    strategy: str = "hash",
+) -> List[Tuple[str, int, Optional[ProxyView]]]:
+    """Batch form of :func:`get_rotated_proxy`.
+
+    Each entry is ``(token, rotate_every, count)`` and yields ``count`` consecutive picks, exactly
+    as if the single-call endpoint had been hit ``count`` times. All counters move in one
+    pipelined Redis round trip and every pick shares one candidate snapshot.
+    """
+
+    if not entries:
+        return []
+    counts = incr_token_counts([(token, count) for token, _, count in entries])
+    snapshot = _candidate_cache.get(min_score)
+    picks: List[Tuple[str, int, Optional[ProxyView]]] = []
+    for (token, rotate_every, count), last in zip(entries, counts):
+        if rotate_every <= 0:
+            rotate_every = 1
+        for n in range(last - count + 1, last + 1):
+            rotate_step = (n - 1) // rotate_every
+            picks.append((token, rotate_every, _pick(snapshot, token, rotate_step, strategy)))
+    return picks
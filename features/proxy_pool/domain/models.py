@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, NamedTuple, Optional, Union
 
 
 @dataclass
@@ -23,3 +23,111 @@ class Proxy:
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+
+class ProxyRecord(NamedTuple):
+    """Read-only proxy row with :class:`Proxy`'s fields, in the same order, as a plain tuple.
+
+    Listings hand these out instead of ``Proxy``: one tuple per row, no per-instance dict.
+    """
+
+    id: Optional[int]
+    uri: str
+    scheme: str
+    host: str
+    port: int
+    label: Optional[str]
+    status: str
+    score: float
+    success_count: int
+    fail_count: int
+    avg_latency_ms: float
+    last_checked: Optional[datetime]
+    last_ok: Optional[datetime]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    def to_proxy(self) -> Proxy:
+        return Proxy(*self)
+
+
+# Anything read-only consumers (publishers, rotation, the API) may be handed.
+ProxyView = Union[Proxy, ProxyRecord]
+
+
+@dataclass(frozen=True)
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated
+
+
+@dataclass(frozen=True)
+class ProbeRetention:
+    """How long each resolution of probe history is kept."""
+
+    raw_hours: int = 48
+    hourly_days: int = 14
+    daily_days: int = 180
+
+
+@dataclass(frozen=True)
+class ProbeSchedule:
+    """How long a proxy waits for its next probe, from its score, status and score volatility.
+
+    A perfectly stable proxy waits ``max_seconds``; the wait shrinks as the score swings, by half
+    once the average swing per probe reaches ``volatility_ref`` points. Published proxies (up, with
+    at least ``publish_score``) wait no longer than ``hot_seconds``, and nothing waits less than
+    ``min_seconds``. Proxies never probed are due at once.
+    """
+
+    min_seconds: int = 300
+    hot_seconds: int = 900
+    max_seconds: int = 6 * 3600
+    volatility_ref: float = 5.0
+    publish_score: float = 60.0
+
+
+@dataclass(frozen=True)
+class ProbeCompaction:
+    rolled_hourly: int = 0
+    rolled_daily: int = 0
+    deleted_raw: int = 0
+    deleted_hourly: int = 0
+    deleted_daily: int = 0
+
+
+@dataclass(frozen=True)
+class EvictionPolicy:
+    """When a proxy counts as dead: enough failures and no success for ``stale_days``."""
+
+    min_failures: int = 10
+    stale_days: int = 7
+    archive_retention_days: int = 30
+    vacuum_pages: int = 0  # 0 releases every free page
+
+
+@dataclass(frozen=True)
+class EvictionResult:
+    archived: int = 0
+    expired_archive: int = 0
+    pages_freed: int = 0
+    # Health-check probes the archived proxies would have cost per HEALTHCHECK_MAX_INTERVAL.
+    probes_saved_per_cycle: int = 0
+
+
+@dataclass(frozen=True)
+class PoolDelta:
+    """Net pool changes after generation ``since``, up to ``generation``.
+
+    ``added`` and ``rescored`` carry each proxy's latest row, which may already reflect writes
+    after ``generation``; applying the same entries again is harmless.
+    """
+
+    since: int
+    generation: int
+    added: List[ProxyRecord]
+    removed: List[str]
+    rescored: List[ProxyRecord]
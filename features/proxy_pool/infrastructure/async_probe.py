@@ -0,0 +1,87 @@
+"""Asyncio probe engine: thousands of probes through local proxy listeners on one event loop.
+
+Each probe opens a connection to a local HTTP proxy listener (a mihomo/glider port), sends one
+absolute-form ``GET`` for the test URL and reads only the status line. A global semaphore caps
+probes in flight, a per-upstream-host semaphore keeps many nodes on one server from being hit at
+once, and every probe is bounded by its own timeout.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .healthcheck import TEST_LISTEN_HOST, TEST_URL, TIMEOUT
+from .metrics import PROBE_SECONDS
+
+
+ProbeResult = Tuple[str, bool, Optional[float]]
+
+_OK_STATUS = (b"200", b"204")
+
+
+@dataclass(frozen=True)
+class ProbeTarget:
+    uri: str
+    port: int  # local listener that forwards through the proxy
+    upstream: str  # proxy server host, the key for the per-host limit
+
+
+class AsyncProbeEngine:
+    def __init__(
+        self,
+        *,
+        concurrency: int = 1000,
+        per_host: int = 16,
+        timeout: float = TIMEOUT,
+        url: str = TEST_URL,
+        listen_host: str = TEST_LISTEN_HOST,
+    ) -> None:
+        self._concurrency = max(1, concurrency)
+        self._per_host = max(1, per_host)
+        self._timeout = timeout
+        self._listen_host = listen_host
+        host = urlsplit(url).netloc
+        self._request = (
+            f"GET {url} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: proxypool-probe\r\n"
+            "Accept: */*\r\nConnection: close\r\n\r\n"
+        ).encode("ascii")
+
+    def run(self, targets: Sequence[ProbeTarget]) -> List[ProbeResult]:
+        """Probe ``targets`` on a private event loop; results are in ``targets`` order."""
+
+        if not targets:
+            return []
+        return asyncio.run(self.probe_all(targets))
+
+    async def probe_all(self, targets: Sequence[ProbeTarget]) -> List[ProbeResult]:
+        # Semaphores belong to the running loop, so they are created per call.
+        limit = asyncio.Semaphore(self._concurrency)
+        hosts: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self._per_host))
+        return list(await asyncio.gather(*(self._probe(t, limit, hosts[t.upstream]) for t in targets)))
+
+    async def _probe(self, target: ProbeTarget, limit: asyncio.Semaphore, host: asyncio.Semaphore) -> ProbeResult:
+        async with host, limit:
+            started = time.perf_counter()
+            try:
+                ok = await asyncio.wait_for(self._fetch(target.port), self._timeout)
+            except (OSError, asyncio.TimeoutError):
+                ok = False
+            elapsed = time.perf_counter() - started
+        PROBE_SECONDS.observe(elapsed, result="ok" if ok else "fail")
+        return target.uri, ok, elapsed * 1000.0 if ok else None
+
+    async def _fetch(self, port: int) -> bool:
+        reader, writer = await asyncio.open_connection(self._listen_host, port)
+        try:
+            writer.write(self._request)
+            await writer.drain()
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+        parts = status_line.split(None, 2)
+        return len(parts) >= 2 and parts[1] in _OK_STATUS
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from features.proxy_pool.application.ports import ProxyStoreFactory
+from features.proxy_pool.application.selection import AliasTable, WeightedHashRing, proxy_weight
+from features.proxy_pool.domain.models import ProxyRecord, ProxyView
+
+from .pool_snapshot import MappedPoolSnapshot
+from .settings import rotate_weight_latency_ref_ms, rotate_weight_score_exponent
+
+
+def weighted_alias_table(candidates: Sequence[ProxyView]) -> AliasTable:
+    """Alias table over ``candidates`` with the configured rotation weights."""
+
+    exponent = rotate_weight_score_exponent()
+    latency_ref = rotate_weight_latency_ref_ms()
+    return AliasTable(candidates, [proxy_weight(p, exponent, latency_ref) for p in candidates])
+
+
+@dataclass(frozen=True)
+class CandidateSnapshot:
+    """Immutable, score-ordered view of the pool for a single ``min_score`` bucket."""
+
+    generation: int
+    min_score: float
+    limit: int
+    candidates: Tuple[ProxyRecord, ...]
+
+    @cached_property
+    def ring(self) -> WeightedHashRing:
+        # Built on first use and then shared by every request that sees this generation.
+        return WeightedHashRing(self.candidates)
+
+    @cached_property
+    def alias(self) -> AliasTable:
+        return weighted_alias_table(self.candidates)
+
+
+class CandidateCache:
+    """Keeps per-bucket candidate snapshots in process memory until the pool generation moves.
+
+    The generation is polled at most once per ``check_interval`` seconds, so requests arriving
+    inside that window are served without touching the store at all. Listings are read from
+    ``snapshot_source`` (the mmap pool snapshot) when it has caught up with the store's
+    generation, and from the store itself when it is missing or behind.
+    """
+
+    def __init__(
+        self,
+        store_factory: ProxyStoreFactory,
+        *,
+        snapshot_source: Optional[Callable[[], Optional[MappedPoolSnapshot]]] = None,
+        limit: int = 200,
+        check_interval: float = 1.0,
+        max_buckets: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._store_factory = store_factory
+        self._snapshot_source = snapshot_source
+        self._limit = limit
+        self._check_interval = check_interval
+        self._max_buckets = max_buckets
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._checked_at = float("-inf")
+        self._snapshots: Dict[Tuple[float, int], CandidateSnapshot] = {}
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def get(self, min_score: float, limit: int | None = None) -> CandidateSnapshot:
+        key = (float(min_score), limit or self._limit)
+        now = self._clock()
+        if now - self._checked_at < self._check_interval:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                return snapshot
+        with self._lock:
+            return self._refresh(key, now)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation = None
+            self._checked_at = float("-inf")
+            self._snapshots = {}
+
+    def _refresh(self, key: Tuple[float, int], now: float) -> CandidateSnapshot:
+        store = self._store_factory()
+        try:
+            if now - self._checked_at >= self._check_interval:
+                generation = store.generation()
+                self._checked_at = now
+                if generation != self._generation:
+                    self._generation = generation
+                    self._snapshots = {}
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                return snapshot
+            min_score, limit = key
+            snapshot = CandidateSnapshot(
+                generation=self._generation or 0,
+                min_score=min_score,
+                limit=limit,
+                candidates=tuple(self._listing_source(store).list_records(min_score=min_score, limit=limit)),
+            )
+        finally:
+            store.close()
+        snapshots = dict(self._snapshots) if len(self._snapshots) < self._max_buckets else {}
+        snapshots[key] = snapshot
+        # Swap the whole mapping so lock-free readers never see a dict mid-update.
+        self._snapshots = snapshots
+        return snapshot
+
+    def _listing_source(self, store):
+        mapped = self._snapshot_source() if self._snapshot_source is not None else None
+        if mapped is not None and mapped.generation() >= (self._generation or 0):
+            return mapped
+        return store
@@ -1,23 +1,85 @@
 from __future__ import annotations
 
 import os
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Optional
+from typing import Callable, ContextManager, List, Optional
 
 from sqlalchemy import (
+    BigInteger,
+    Boolean,
     Column,
     Integer,
     String,
     Float,
     DateTime,
+    Index,
     create_engine,
+    event,
+    inspect,
+    select,
+    update,
     UniqueConstraint,
 )
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from .file_lock import FileLock
+from .settings import SqliteProfile, sqlite_profile
+
+
+def _apply_sqlite_pragmas(profile: SqliteProfile):
+    def on_connect(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout first so the journal-mode switch itself waits instead of failing.
+            cursor.execute(f"PRAGMA busy_timeout={profile.busy_timeout_ms}")
+            # Only takes effect on a database without tables; older files are converted by the GC job.
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute(f"PRAGMA journal_mode={profile.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={profile.synchronous}")
+            cursor.execute(f"PRAGMA mmap_size={profile.mmap_size}")
+            cursor.execute(f"PRAGMA cache_size=-{profile.cache_size_kib}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def build_engine(url: str, profile: Optional[SqliteProfile] = None) -> Engine:
+    """Create an engine; SQLite URLs get the WAL/busy-timeout profile applied on every connection."""
+
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True)
+    profile = profile or sqlite_profile()
+    created = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": profile.busy_timeout_ms / 1000.0},
+    )
+    event.listen(created, "connect", _apply_sqlite_pragmas(profile))
+    return created
+
+
+def writer_lock(bind: Engine, profile: Optional[SqliteProfile] = None) -> ContextManager[object]:
+    """Serialise writers across processes so they queue on a lock instead of SQLITE_BUSY retries.
+
+    Readers never take this lock; with WAL they keep reading the last committed snapshot while a
+    writer holds it.
+    """
+
+    database = bind.url.database if bind.dialect.name == "sqlite" else None
+    if not database or database == ":memory:":
+        return nullcontext()
+    if not (profile or sqlite_profile()).serialize_writers:
+        return nullcontext()
+    return FileLock(f"{database}.write.lock")
+
 
 DB_PATH = os.environ.get("PROXYPOOL_DB", os.path.join(os.getcwd(), "data.db"))
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+# e.g. postgresql+psycopg://user:pass@db/proxypool for several hosts sharing one pool.
+DATABASE_URL = os.environ.get("DATABASE_URL") or f"sqlite:///{DB_PATH}"
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
@@ -39,12 +101,189 @@ class ProxyORM(Base):
     last_ok = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Set while a health worker holds the row for probing; expired leases are claimable again.
+    lease_until = Column(DateTime, nullable=True)
+    # Probe schedule: when the next probe is due (NULL: never probed, due now) and the moving
+    # average of the score change per probe that shortens the wait.
+    next_due_at = Column(DateTime, nullable=True)
+    score_volatility = Column(Float, default=0.0, server_default="0", nullable=False)
 
     __table_args__ = (
         UniqueConstraint("uri", name="uq_proxy_uri"),
+        # Listing / rotation order: range on score, then ties by id, with no sort step.
+        Index("ix_proxies_score_id", score.desc(), id),
+        # Status-filtered listings and the per-status counts (covering for the latter).
+        Index("ix_proxies_status_score", status, score.desc(), id),
+        # Staleness scans: least recently checked first.
+        Index("ix_proxies_last_checked", last_checked),
+        # Probe claims: earliest due first.
+        Index("ix_proxies_next_due_at", next_due_at),
+    )
+
+
+class ProxyArchiveORM(Base):
+    """Cold copy of evicted proxies; while a row is here the URI is not re-imported."""
+
+    __tablename__ = "proxies_archive"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uri = Column(String(2048), nullable=False, unique=True)
+    scheme = Column(String(16), nullable=False)
+    host = Column(String(255), nullable=False)
+    port = Column(Integer, nullable=False)
+    label = Column(String(255), nullable=True)
+    score = Column(Float, nullable=False)
+    success_count = Column(Integer, nullable=False)
+    fail_count = Column(Integer, nullable=False)
+    last_checked = Column(DateTime, nullable=True)
+    last_ok = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_proxies_archive_archived_at", archived_at),
+    )
+
+
+class ProxyProbeORM(Base):
+    """One row per probe; rolled up into :class:`ProbeRollupORM` and expired by compaction."""
+
+    __tablename__ = "proxy_probes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    proxy_id = Column(Integer, nullable=False)
+    ts = Column(DateTime, nullable=False)
+    ok = Column(Boolean, nullable=False)
+    latency_ms = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_proxy_probes_proxy_ts", proxy_id, ts),
+        Index("ix_proxy_probes_ts", ts),
     )
 
 
-def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+class ProbeRollupORM(Base):
+    """Probe counts per proxy and ``hour``/``day`` bucket."""
+
+    __tablename__ = "proxy_probe_rollups"
+    proxy_id = Column(Integer, primary_key=True)
+    period = Column(String(8), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    probes = Column(Integer, default=0, nullable=False)
+    successes = Column(Integer, default=0, nullable=False)
+    latency_sum = Column(Float, default=0.0, nullable=False)
+    latency_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_proxy_probe_rollups_period_bucket", period, bucket),
+    )
+
+
+class PoolMetaORM(Base):
+    __tablename__ = "pool_meta"
+    key = Column(String(64), primary_key=True)
+    # Epoch-second watermarks and the generation counter outgrow a 32-bit PostgreSQL integer.
+    value = Column(BigInteger, default=0, nullable=False)
+
+
+class PoolChangeORM(Base):
+    """Which URIs a pool generation ``added``, ``removed`` or ``rescored``; pruned by generation."""
+
+    __tablename__ = "pool_changes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    generation = Column(BigInteger, nullable=False)
+    uri = Column(String(2048), nullable=False)
+    kind = Column(String(8), nullable=False)
+
+    __table_args__ = (
+        Index("ix_pool_changes_generation", generation),
+    )
+
+
+SCHEMA_VERSION_KEY = "schema_version"
+GENERATION_KEY = "generation"
+# Oldest generation the change log is complete after; raised when old changes are pruned.
+CHANGES_FLOOR_KEY = "changes_floor"
+
+
+def _proxy_index(name: str) -> Index:
+    return next(index for index in ProxyORM.__table__.indexes if index.name == name)
+
+
+def _add_hot_query_indexes(conn: Connection) -> None:
+    present = {column["name"] for column in inspect(conn).get_columns("proxies")}
+    for index in ProxyORM.__table__.indexes:
+        # Indexes over columns added by a later migration are created by that migration.
+        if {column.name for column in index.columns} <= present:
+            index.create(conn, checkfirst=True)
+    # Fresh statistics so the planner weighs the new indexes against the table size.
+    conn.exec_driver_sql("ANALYZE proxies")
+
+
+def _add_probe_lease(conn: Connection) -> None:
+    if "lease_until" in {column["name"] for column in inspect(conn).get_columns("proxies")}:
+        return
+    column_type = DateTime().compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE proxies ADD COLUMN lease_until {column_type}")
+
+
+def _start_change_log(conn: Connection) -> None:
+    # Generations reached before the log existed have no change rows behind them.
+    meta = PoolMetaORM.__table__
+    if conn.execute(select(meta.c.value).where(meta.c.key == CHANGES_FLOOR_KEY)).first() is not None:
+        return
+    generation = conn.execute(select(meta.c.value).where(meta.c.key == GENERATION_KEY)).scalar_one_or_none()
+    conn.execute(meta.insert().values(key=CHANGES_FLOOR_KEY, value=generation or 0))
+
+
+def _add_probe_schedule(conn: Connection) -> None:
+    # Existing rows keep next_due_at NULL, so each is probed once and then scheduled.
+    columns = {column["name"] for column in inspect(conn).get_columns("proxies")}
+    if "next_due_at" not in columns:
+        column_type = DateTime().compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE proxies ADD COLUMN next_due_at {column_type}")
+    if "score_volatility" not in columns:
+        column_type = Float().compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE proxies ADD COLUMN score_volatility {column_type} NOT NULL DEFAULT 0")
+    _proxy_index("ix_proxies_next_due_at").create(conn, checkfirst=True)
+
+
+def _widen_meta_counters(conn: Connection) -> None:
+    # SQLite integers are already 64-bit; PostgreSQL created these columns as int4.
+    if conn.dialect.name != "postgresql":
+        return
+    conn.exec_driver_sql("ALTER TABLE pool_meta ALTER COLUMN value TYPE BIGINT")
+    conn.exec_driver_sql("ALTER TABLE pool_changes ALTER COLUMN generation TYPE BIGINT")
+
+
+# Applied in order to databases whose recorded schema version is lower; append, never reorder.
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _add_hot_query_indexes,
+    _add_probe_lease,
+    _start_change_log,
+    _add_probe_schedule,
+    _widen_meta_counters,
+]
+
+
+def init_db(bind: Optional[Engine] = None) -> None:
+    """Create missing tables, then run the migrations the database has not seen yet.
+
+    ``create_all`` never alters existing tables, so indexes and columns added after a database
+    was first created reach it only through :data:`MIGRATIONS`.
+    """
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    with writer_lock(bind), bind.begin() as conn:
+        current = conn.execute(
+            select(PoolMetaORM.value).where(PoolMetaORM.key == SCHEMA_VERSION_KEY)
+        ).scalar_one_or_none()
+        applied = current or 0
+        for step in MIGRATIONS[applied:]:
+            step(conn)
+        if current is None:
+            conn.execute(PoolMetaORM.__table__.insert().values(key=SCHEMA_VERSION_KEY, value=len(MIGRATIONS)))
+        elif applied < len(MIGRATIONS):
+            conn.execute(
+                update(PoolMetaORM).where(PoolMetaORM.key == SCHEMA_VERSION_KEY).values(value=len(MIGRATIONS))
+            )
 
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class FileLock:
+    """Exclusive advisory lock shared by every process that opens the same path.
+
+    ``flock`` locks belong to the open file description, so the lock is also released by the
+    kernel if the holder dies. Threads in one process are serialised by an in-process lock
+    first, because ``flock`` does not exclude other threads holding the same descriptor.
+    On platforms without ``fcntl`` only the in-process lock applies.
+    """
+
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: Path | str) -> None:
+        self._path = str(path)
+        with FileLock._registry_lock:
+            self._thread_lock = FileLock._thread_locks.setdefault(self._path, threading.Lock())
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if fcntl is None:
+            return
+        try:
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except Exception:
+            self._thread_lock.release()
+            raise
+        self._fd = fd
+
+    def release(self) -> None:
+        try:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+        finally:
+            self._fd = None
+            self._thread_lock.release()
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
@@ -1,24 +1,27 @@
 from __future__ import annotations
 
 import subprocess
-import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 import requests
 
 from features.proxy_pool.application.ports import ForwardTester
 from features.proxy_pool.domain.subscriptions import ForwardNode, GliderConfig
 
+from .port_allocator import PortAllocator, shared_port_allocator
+from .readiness import wait_for_listener
+
 
 @dataclass
 class GliderForwardTester(ForwardTester):
     glider_path: Path
     listen_host: str = '127.0.0.1'
-    start_port: int = 18081
+    port_allocator: Optional[PortAllocator] = None
     timeout: int = 8
+    startup_timeout: float = 5.0
     max_workers: int = 20
     test_url: str = 'http://www.msftconnecttest.com/connecttest.txt#expect=200'
     expect_statuses: Iterable[int] = (200, 204)
@@ -31,8 +34,8 @@ class GliderForwardTester(ForwardTester):
         usable: List[ForwardNode] = []
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             future_map = {
-                executor.submit(self._test_node, index, node): node
-                for index, node in enumerate(nodes)
+                executor.submit(self._test_node, node): node
+                for node in nodes
             }
             for future in as_completed(future_map):
                 node = future_map[future]
@@ -53,8 +56,13 @@ class GliderForwardTester(ForwardTester):
         except Exception:
             pass
 
-    def _test_node(self, index: int, node: ForwardNode) -> bool:
-        port = self.start_port + index
+    def _test_node(self, node: ForwardNode) -> bool:
+        with (self.port_allocator or shared_port_allocator()).lease() as lease:
+            if not lease.ports:
+                return False
+            return self._test_on_port(node, lease.port)
+
+    def _test_on_port(self, node: ForwardNode, port: int) -> bool:
         config_path = self.config_dir / f'glider.test.{port}.conf'
         config_content = self._config_template(port) + node.as_line()
         config_path.parent.mkdir(parents=True, exist_ok=True)
@@ -62,7 +70,8 @@ class GliderForwardTester(ForwardTester):
         proc = None
         try:
             proc = subprocess.Popen([str(self.glider_path), '-config', str(config_path)])
-            time.sleep(0.8)
+            if not wait_for_listener(self.listen_host, port, timeout=self.startup_timeout, proc=proc):
+                return False
             proxies: Dict[str, str] = {
                 'http': f'http://{self.listen_host}:{port}',
                 'https': f'http://{self.listen_host}:{port}',
@@ -4,10 +4,11 @@ from pathlib import Path
 from typing import List
 
 from features.proxy_pool.application.ports import ProxyPublisher
-from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.domain.models import ProxyView
 from features.proxy_pool.domain.subscriptions import ForwardNode, GliderConfig
 
 from .config_writer import FileConfigWriter
+from .metrics import PUBLISH_SECONDS, PUBLISHED_PROXIES
 from .parser import format_forward_line
 from .settings import glider_http_listen, glider_score_threshold
 
@@ -22,22 +23,24 @@ class GliderConfigPublisher(ProxyPublisher):
         self._enable_healthcheck = enable_healthcheck
         self._max_publish = max_publish
 
-    def publish(self, proxies: List[Proxy]) -> None:
-        ordered = self._order_by_threshold(proxies)
-        if self._max_publish > 0:
-            ordered = ordered[: self._max_publish]
-        nodes = [ForwardNode(raw=format_forward_line(proxy)) for proxy in ordered]
-        config = GliderConfig(
-            listen=self._listen,
-            healthcheck_url="",
-            forwards=nodes,
-            healthcheck_enabled=self._enable_healthcheck,
-        )
-        self._writer.write(config)
-
-    def _order_by_threshold(self, proxies: List[Proxy]) -> List[Proxy]:
+    def publish(self, proxies: List[ProxyView]) -> None:
+        with PUBLISH_SECONDS.time():
+            ordered = self._order_by_threshold(proxies)
+            if self._max_publish > 0:
+                ordered = ordered[: self._max_publish]
+            nodes = [ForwardNode(raw=format_forward_line(proxy)) for proxy in ordered]
+            config = GliderConfig(
+                listen=self._listen,
+                healthcheck_url="",
+                forwards=nodes,
+                healthcheck_enabled=self._enable_healthcheck,
+            )
+            self._writer.write(config)
+        PUBLISHED_PROXIES.set(len(nodes))
+
+    def _order_by_threshold(self, proxies: List[ProxyView]) -> List[ProxyView]:
         seen: set[str] = set()
-        healthy: List[Proxy] = []
+        healthy: List[ProxyView] = []
         for proxy in proxies:
             if proxy.uri in seen:
                 continue
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
 import os
+import shutil
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from features.proxy_pool.application.ports import ProxyHealthService, ProxyStoreFactory
-from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.domain.models import Proxy, ProxyRecord, ProxyView
 
+from .async_probe import AsyncProbeEngine
 from .healthcheck import check_forward
+from .metrics import HEALTH_CYCLE_SECONDS, POOL_SIZE
 from .parser import format_forward_line
+from .port_allocator import PortAllocator, shared_port_allocator
+from .probe_host import MihomoProbeHost
+from .settings import probe_budget, probe_host_batch_size, probe_host_concurrency, probe_lease_seconds, probe_per_host_limit
 
 
 class GliderProxyHealthService(ProxyHealthService):
-    """Evaluates proxies by spawning temporary glider instances and recording health metrics."""
+    """Evaluates proxies and records health metrics.
+
+    With a mihomo binary available, claimed batches go through :class:`MihomoProbeHost`, one
+    process per batch; otherwise, and for anything the host hands back, each proxy gets its own
+    temporary glider instance.
+    """
 
     def __init__(
         self,
@@ -21,28 +33,82 @@ class GliderProxyHealthService(ProxyHealthService):
         *,
         worker_count: int | None = None,
         publish_limit: int = 10000,
-        port_base: int = 18081,
-        port_span: int = 2000,
+        budget: int | None = None,
+        port_allocator: PortAllocator | None = None,
     ) -> None:
         self._store_factory = store_factory
         self._worker_count = worker_count or int(os.environ.get("HEALTHCHECK_WORKERS", "10"))
         self._publish_limit = publish_limit
-        self._port_base = port_base
-        self._port_span = port_span
+        self._budget = budget or probe_budget()
+        self._ports = port_allocator or shared_port_allocator()
 
-    def evaluate(self) -> List[Proxy]:
-        glider_bin = self._resolve_glider_binary()
-        if glider_bin is None:
-            return []
+    def evaluate(self) -> List[ProxyView]:
+        """Probe the proxies that are due, earliest due first, in claimed batches.
 
-        proxies = self._load_candidates()
-        if not proxies:
+        Batches are leased through ``claim_for_probe``, so health workers running at the same
+        time (on one host or, with a shared database, several) split the pool between them.
+        At most ``budget`` proxies are probed per pass; the rest stay due for the next one.
+        """
+        glider_bin = self._resolve_glider_binary()
+        probe_host = self._probe_host()
+        if glider_bin is None and probe_host is None:
             return []
 
-        results = self._run_checks(glider_bin, proxies)
-        self._record_results(results)
+        started = datetime.utcnow()
+        batch_size = probe_host.batch_size if probe_host else max(1, self._worker_count) * 4
+        probed = 0
+        with HEALTH_CYCLE_SECONDS.time():
+            while probed < self._budget:
+                batch = self._claim(started, min(batch_size, self._budget - probed))
+                if not batch:
+                    break
+                results: List[Tuple[str, bool, float | None]] = []
+                leftovers: List[Proxy] = batch
+                if probe_host is not None:
+                    results, leftovers = probe_host.probe_batch(batch)
+                # Without glider, leftovers stay unrecorded and are claimed again once their lease ends.
+                if leftovers and glider_bin is not None:
+                    results += self._run_checks(glider_bin, leftovers)
+                self._record_results(results)
+                probed += len(batch)
+        self._report_pool_size()
         return self._load_candidates(limit=self._publish_limit)
 
+    def _claim(self, started: datetime, limit: int) -> List[Proxy]:
+        store = self._store_factory()
+        try:
+            return store.claim_for_probe(limit, checked_before=started, lease_seconds=probe_lease_seconds())
+        finally:
+            store.close()
+
+    def _report_pool_size(self) -> None:
+        store = self._store_factory()
+        try:
+            for status, count in store.count_by_status().items():
+                POOL_SIZE.set(count, status=status)
+        finally:
+            store.close()
+
+    def _probe_host(self) -> MihomoProbeHost | None:
+        mihomo_bin = self._resolve_mihomo_binary()
+        if mihomo_bin is None:
+            return None
+        return MihomoProbeHost(
+            mihomo_bin,
+            batch_size=probe_host_batch_size(),
+            engine=AsyncProbeEngine(concurrency=probe_host_concurrency(), per_host=probe_per_host_limit()),
+            port_allocator=self._ports,
+        )
+
+    def _resolve_mihomo_binary(self) -> Path | None:
+        candidate = Path(os.environ.get("MIHOMO_BIN", "/usr/local/bin/mihomo"))
+        if not candidate.exists():
+            found = shutil.which("mihomo")
+            if found is None:
+                return None
+            candidate = Path(found)
+        return candidate
+
     def _resolve_glider_binary(self) -> Path | None:
         candidate = Path(os.environ.get("GLIDER_BIN", "/usr/local/bin/glider"))
         if not candidate.exists():
@@ -56,11 +122,11 @@ class GliderProxyHealthService(ProxyHealthService):
             pass
         return candidate
 
-    def _load_candidates(self, limit: int | None = None) -> List[Proxy]:
+    def _load_candidates(self, limit: int | None = None) -> List[ProxyRecord]:
         effective_limit = limit or self._publish_limit
         store = self._store_factory()
         try:
-            return store.list(min_score=0.0, limit=effective_limit)
+            return store.list_records(min_score=0.0, limit=effective_limit)
         finally:
             store.close()
 
@@ -68,17 +134,21 @@ class GliderProxyHealthService(ProxyHealthService):
         results: List[Tuple[str, bool, float | None]] = []
         max_workers = max(1, self._worker_count)
 
-        def _run(idx: int, proxy: Proxy) -> Tuple[str, bool, float | None]:
-            forward_line = format_forward_line(proxy)
-            port = self._port_base + (idx % self._port_span)
-            ok, latency = check_forward(glider_bin, forward_line, port)
+        def _run(proxy: Proxy) -> Optional[Tuple[str, bool, float | None]]:
+            with self._ports.lease() as lease:
+                if not lease.ports:
+                    # No port to listen on is not the proxy's fault; leave it for the next claim.
+                    return None
+                ok, latency = check_forward(glider_bin, format_forward_line(proxy), lease.port)
             return proxy.uri, ok, latency
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(_run, idx, proxy): proxy.uri for idx, proxy in enumerate(proxies)}
+            futures = {executor.submit(_run, proxy): proxy.uri for proxy in proxies}
             for future in as_completed(futures):
                 try:
-                    results.append(future.result())
+                    result = future.result()
+                    if result is not None:
+                        results.append(result)
                 except Exception:
                     uri = futures[future]
                     results.append((uri, False, None))
@@ -89,7 +159,6 @@ class GliderProxyHealthService(ProxyHealthService):
             return
         store = self._store_factory()
         try:
-            for uri, ok, latency in results:
-                store.update_health(uri, ok, latency if ok else None)
+            store.record_health_batch([(uri, ok, latency if ok else None) for uri, ok, latency in results])
         finally:
             store.close()
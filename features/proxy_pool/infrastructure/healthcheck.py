@@ -7,10 +7,14 @@ from typing import Optional
 
 import requests
 
+from .metrics import GLIDER_SPAWNS, PROBE_SECONDS
+from .readiness import wait_for_listener
+
 
 TEST_URL = "http://www.msftconnecttest.com/connecttest.txt"
 TIMEOUT = 8
 TEST_LISTEN_HOST = "127.0.0.1"
+STARTUP_TIMEOUT = 5.0
 
 
 def _write_temp_cfg(glider_path: Path, forward_line: str, port: int) -> Path:
@@ -24,24 +28,43 @@ def _write_temp_cfg(glider_path: Path, forward_line: str, port: int) -> Path:
     return cfg_path
 
 
+def probe_listener(port: int) -> tuple[bool, Optional[float]]:
+    """Fetch ``TEST_URL`` through the local HTTP proxy listening on ``port``."""
+
+    proxies = {
+        "http": f"http://{TEST_LISTEN_HOST}:{port}",
+        "https": f"http://{TEST_LISTEN_HOST}:{port}",
+    }
+    start = time.time()
+    try:
+        resp = requests.get(TEST_URL, timeout=TIMEOUT, proxies=proxies, verify=False)
+    except Exception:
+        return False, None
+    ok = resp.status_code in (200, 204)
+    latency = (time.time() - start) * 1000.0
+    return ok, latency if ok else None
+
+
 def check_forward(glider_bin: Path, forward_line: str, port: int) -> tuple[bool, Optional[float]]:
     proc = None
+    started = time.perf_counter()
+    ok = False
     cfg = _write_temp_cfg(glider_bin, forward_line, port)
     try:
-        proc = subprocess.Popen([str(glider_bin), "-config", str(cfg)], stdout=None, stderr=None, universal_newlines=True)
-        time.sleep(0.5)
-        proxies = {
-            "http": f"http://{TEST_LISTEN_HOST}:{port}",
-            "https": f"http://{TEST_LISTEN_HOST}:{port}",
-        }
-        start = time.time()
-        resp = requests.get(TEST_URL, timeout=TIMEOUT, proxies=proxies, verify=False)
-        ok = resp.status_code in (200, 204)
-        latency = (time.time() - start) * 1000.0
-        return ok, latency if ok else None
+        try:
+            proc = subprocess.Popen([str(glider_bin), "-config", str(cfg)], stdout=None, stderr=None, universal_newlines=True)
+        except Exception:
+            GLIDER_SPAWNS.inc(outcome="error")
+            raise
+        GLIDER_SPAWNS.inc(outcome="ok")
+        if not wait_for_listener(TEST_LISTEN_HOST, port, timeout=STARTUP_TIMEOUT, proc=proc):
+            return False, None
+        ok, latency = probe_listener(port)
+        return ok, latency
     except Exception:
         return False, None
     finally:
+        PROBE_SECONDS.observe(time.perf_counter() - started, result="ok" if ok else "fail")
         if proc:
             try:
                 proc.terminate()
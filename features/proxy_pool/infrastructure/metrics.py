@@ -0,0 +1,321 @@
+"""Minimal Prometheus-compatible metrics.
+
+Kept dependency-free so the rotate path only pays for a dict lookup, a lock and a couple of
+float additions. Worker processes push their samples to Redis (see :func:`push_to_redis`) and
+the API merges them into its own ``/metrics`` output.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+PUSH_KEY_PREFIX = "proxypool:metrics:"
+PUSH_INTERVAL = 15
+# A few missed pushes, after which a dead process's samples stop being served.
+PUSH_TTL = 4 * PUSH_INTERVAL
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple([labels.get(n, "") for n in self.labelnames])
+
+    def _labels(self, key: LabelKey) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(f"{self.name}_total", self._labels(k), v) for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(k), v) for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: LabelKey, value: float) -> None:
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            slot = self._values.get(key)
+            if slot is None:
+                slot = self._values[key] = [0.0] * (len(self._buckets) + 2)
+            slot[index] += 1
+            slot[-1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, self._key(labels))
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out: List[Sample] = []
+        for key, slot in items:
+            labels = self._labels(key)
+            cumulative = 0.0
+            for bound, count in zip(self._buckets, slot):
+                cumulative += count
+                out.append((f"{self.name}_bucket", {**labels, "le": _fmt(bound)}, cumulative))
+            cumulative += slot[len(self._buckets)]
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, cumulative))
+            out.append((f"{self.name}_count", labels, cumulative))
+            out.append((f"{self.name}_sum", labels, slot[-1]))
+        return out
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_key", "_start")
+
+    def __init__(self, histogram: Histogram, key: LabelKey) -> None:
+        self._histogram = histogram
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._start = perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram._observe(self._key, perf_counter() - self._start)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def collect(self) -> List[Dict[str, object]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [
+            {"name": m.name, "type": m.kind, "help": m.documentation, "samples": m.samples()}
+            for m in metrics
+        ]
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+
+ROTATE_SECONDS = histogram("proxypool_rotate_seconds", "Latency of rotate picks.", ("strategy",))
+STORE_SECONDS = histogram("proxypool_store_seconds", "Latency of ProxyStore operations.", ("op",))
+REDIS_ROUND_TRIPS = counter("proxypool_redis_round_trips", "Redis round trips issued.", ("op",))
+PROBE_SECONDS = histogram("proxypool_probe_seconds", "Duration of single proxy probes.", ("result",))
+GLIDER_SPAWNS = counter("proxypool_glider_spawns", "Probe glider process launches.", ("outcome",))
+PROBE_STARTUP_SECONDS = histogram(
+    "proxypool_probe_startup_seconds",
+    "Time from launching a probe process until its listeners accept connections.",
+    ("launcher", "result"),
+)
+PROBE_HOST_SPAWNS = counter("proxypool_probe_host_spawns", "Multi-listener probe host launches.", ("outcome",))
+HEALTH_CYCLE_SECONDS = histogram(
+    "proxypool_health_cycle_seconds",
+    "Duration of a full health-check pass.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+PUBLISH_SECONDS = histogram("proxypool_publish_seconds", "Duration of glider config publishing.")
+PUBLISHED_PROXIES = gauge("proxypool_published_proxies", "Proxies written to glider.conf by the last publish.")
+GC_EVICTED = counter("proxypool_gc_evicted", "Proxies moved to the archive by the dead-proxy GC.")
+GC_PROBES_SAVED = gauge(
+    "proxypool_gc_probes_saved_per_cycle",
+    "Probes per HEALTHCHECK_MAX_INTERVAL saved by the last GC run.",
+)
+POOL_SIZE = gauge("proxypool_pool_size", "Stored proxies by status after the last health pass.", ("status",))
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else f"{value:.1f}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(
+    families: List[Dict[str, object]],
+    extra: Optional[List[Tuple[Dict[str, str], List[Dict[str, object]]]]] = None,
+    labels: Optional[Dict[str, str]] = None,
+) -> str:
+    """Render families in the Prometheus text format.
+
+    ``extra`` carries ``(labels, families)`` pairs pushed by other processes; their samples are
+    merged into the matching family with the given labels attached. ``labels`` go on this
+    process's own samples, so they do not mix with the pushed series of the same metric.
+    """
+
+    merged: Dict[str, Dict[str, object]] = {}
+    for family in families:
+        merged[str(family["name"])] = {**family, "samples": []}
+    for source_labels, others in [(labels or {}, families), *(extra or [])]:
+        for family in others:
+            target = merged.setdefault(str(family["name"]), {**family, "samples": []})
+            target["samples"].extend(  # type: ignore[union-attr]
+                (name, {**sample_labels, **source_labels}, value)
+                for name, sample_labels, value in family["samples"]  # type: ignore[union-attr]
+            )
+    lines: List[str] = []
+    for name, family in merged.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample_name, labels, value in family["samples"]:  # type: ignore[union-attr]
+            if labels:
+                rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                lines.append(f"{sample_name}{{{rendered}}} {_fmt(value)}")
+            else:
+                lines.append(f"{sample_name} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def source(role: str) -> str:
+    """``source`` label value for this process, e.g. ``worker:host:1234``."""
+
+    return f"{role}:{socket.gethostname()}:{os.getpid()}"
+
+
+def push_to_redis(client, role: str) -> None:
+    """Publish this process's samples so the API can expose them; best effort."""
+
+    try:
+        client.set(f"{PUSH_KEY_PREFIX}{source(role)}", json.dumps(REGISTRY.collect()), ex=PUSH_TTL)
+    except Exception:
+        pass
+
+
+_pusher_lock = threading.Lock()
+_pusher_pid: Optional[int] = None
+
+
+def keep_pushing(client_factory, role: str, interval: float = PUSH_INTERVAL) -> None:
+    """Push this process's samples every ``interval`` seconds from a daemon thread.
+
+    Starts at most one thread per process (a forked child starts its own), so an idle worker's
+    samples are refreshed before ``PUSH_TTL`` expires them.
+    """
+
+    global _pusher_pid
+    with _pusher_lock:
+        if _pusher_pid == os.getpid():
+            return
+        _pusher_pid = os.getpid()
+
+    def run() -> None:
+        while True:
+            time.sleep(interval)
+            push_to_redis(client_factory(), role)
+
+    threading.Thread(target=run, name="metrics-push", daemon=True).start()
+
+
+def pulled_from_redis(client) -> List[Tuple[Dict[str, str], List[Dict[str, object]]]]:
+    out: List[Tuple[Dict[str, str], List[Dict[str, object]]]] = []
+    try:
+        keys = list(client.scan_iter(match=f"{PUSH_KEY_PREFIX}*", count=100))
+        if not keys:
+            return out
+        payloads = client.mget(keys)
+    except Exception:
+        return out
+    for key, payload in zip(keys, payloads):
+        if not payload:
+            continue
+        source = (key.decode() if isinstance(key, bytes) else key)[len(PUSH_KEY_PREFIX):]
+        try:
+            families = json.loads(payload)
+        except ValueError:
+            continue
+        out.append(({"source": source}, families))
+    return out
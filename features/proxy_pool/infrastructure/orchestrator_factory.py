@@ -1,18 +1,23 @@
 from __future__ import annotations
 
 from pathlib import Path
-from features.proxy_pool.application.orchestrator import ProxyPoolOrchestrator
+from features.proxy_pool.application.orchestrator import CompositeProxyPublisher, ProxyPoolOrchestrator
 from features.proxy_pool.application.ports import ProxyStoreFactory
 
 from .collector_runner import SubscriptionProxyCollector
 from .glider_publisher import GliderConfigPublisher
 from .health_service import GliderProxyHealthService
-from .repository import ProxyRepository
-from .settings import glider_max_publish
+from .pool_feed import RedisPoolChangePublisher
+from .pool_snapshot import PoolSnapshotPublisher
+from .repository import ProxyRepository, repository_class
+from .settings import glider_max_publish, pool_snapshot_limit, pool_snapshot_path
+
+
+_store_class = repository_class()
 
 
 def _store_factory() -> ProxyRepository:
-    return ProxyRepository()
+    return _store_class()
 
 
 def build_proxy_pool_orchestrator(
@@ -26,7 +31,14 @@ def build_proxy_pool_orchestrator(
     collector = SubscriptionProxyCollector(project_root=root)
     store_factory: ProxyStoreFactory = _store_factory
     health_service = GliderProxyHealthService(store_factory)
-    publisher = GliderConfigPublisher(output_path, max_publish=glider_max_publish())
+    publishers = [
+        GliderConfigPublisher(output_path, max_publish=glider_max_publish()),
+        RedisPoolChangePublisher(store_factory),
+    ]
+    snapshot_path = pool_snapshot_path()
+    if snapshot_path is not None:
+        publishers.append(PoolSnapshotPublisher(snapshot_path, store_factory, limit=pool_snapshot_limit()))
+    publisher = CompositeProxyPublisher(publishers)
 
     return ProxyPoolOrchestrator(
         collector=collector,
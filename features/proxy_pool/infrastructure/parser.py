@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from typing import Iterable, List
 
-from ..domain.models import Proxy
+from ..domain.models import Proxy, ProxyView
 
 
 _FORWARD_RE = re.compile(r"^forward=(?P<uri>(?P<scheme>ss|vmess)://[^#\s]+)(?:#(?P<label>.*))?$")
@@ -25,7 +25,7 @@ def parse_forwards(lines: Iterable[str]) -> List[Proxy]:
     return proxies
 
 
-def format_forward_line(proxy: Proxy) -> str:
+def format_forward_line(proxy: ProxyView) -> str:
     suffix = f"#{proxy.label}" if proxy.label else ""
     return f"forward={proxy.uri}{suffix}"
 
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+
+from .metrics import STORE_SECONDS
+from .repository import ProxyRepository
+from ..domain.models import Proxy, UpsertResult
+
+
+# Below this many rows the executemany upsert wins over creating and filling a staging table.
+COPY_THRESHOLD = 1000
+
+_NEW = Proxy(id=None, uri="", scheme="", host="", port=0)
+
+_STAGING_DDL = (
+    "CREATE TEMPORARY TABLE proxy_staging "
+    "(uri text, scheme text, host text, port integer, label text) ON COMMIT DROP"
+)
+
+# ``xmax = 0`` only holds for rows this statement inserted, which splits the RETURNING rows
+# into inserted and updated without a separate existence query.
+_MERGE_STAGING = """
+INSERT INTO proxies (uri, scheme, host, port, label, status, score, success_count, fail_count,
+                     avg_latency_ms, created_at, updated_at)
+SELECT s.uri, s.scheme, s.host, s.port, s.label,
+       %(status)s, %(score)s, 0, 0, %(avg_latency_ms)s, %(now)s, %(now)s
+FROM proxy_staging s
+WHERE NOT EXISTS (SELECT 1 FROM proxies_archive a WHERE a.uri = s.uri)
+ON CONFLICT (uri) DO UPDATE SET
+    scheme = EXCLUDED.scheme,
+    host = EXCLUDED.host,
+    port = EXCLUDED.port,
+    label = EXCLUDED.label,
+    updated_at = EXCLUDED.updated_at
+RETURNING uri, (xmax = 0)
+"""
+
+
+class PostgresProxyRepository(ProxyRepository):
+    """PostgreSQL :class:`ProxyStore` for a pool shared by health workers on several hosts.
+
+    Writes rely on row locks instead of the SQLite writer lock, and ``claim_for_probe`` turns
+    into ``FOR UPDATE SKIP LOCKED`` so workers never wait on, or re-probe, each other's rows.
+    Large imports are streamed with ``COPY`` when the engine uses the psycopg (v3) driver.
+    """
+
+    _insert = staticmethod(postgresql.insert)
+
+    def _bucket(self, period: str, column):
+        return func.date_trunc(period, column)
+
+    def upsert_many(self, proxies: Sequence[Proxy]) -> UpsertResult:
+        latest: Dict[str, Proxy] = {}
+        for p in proxies:
+            latest[p.uri] = p
+        if len(latest) < COPY_THRESHOLD or self._session.get_bind().dialect.driver != "psycopg":
+            return super().upsert_many(proxies)
+        with STORE_SECONDS.time(op="upsert_many"):
+            return self._copy_upsert(list(latest.values()))
+
+    def _copy_upsert(self, proxies: List[Proxy]) -> UpsertResult:
+        """COPY into a transaction-scoped staging table, then merge it with one ``INSERT .. SELECT``."""
+        params = {
+            "status": _NEW.status,
+            "score": _NEW.score,
+            "avg_latency_ms": _NEW.avg_latency_ms,
+            "now": datetime.utcnow(),
+        }
+        with self._writing():
+            cursor = self._session.connection().connection.driver_connection.cursor()
+            try:
+                cursor.execute(_STAGING_DDL)
+                with cursor.copy("COPY proxy_staging (uri, scheme, host, port, label) FROM STDIN") as copy:
+                    for p in proxies:
+                        copy.write_row((p.uri, p.scheme, p.host, p.port, p.label))
+                cursor.execute(_MERGE_STAGING, params)
+                merged = cursor.fetchall()
+            finally:
+                cursor.close()
+            added = [uri for uri, inserted in merged if inserted]
+            self._log_changes("added", added)
+        return UpsertResult(inserted=len(added), updated=len(merged) - len(added))
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from redis.exceptions import WatchError
+
+from features.proxy_pool.application.ports import ProxyPublisher, ProxyStoreFactory
+from features.proxy_pool.domain.models import ProxyView
+
+from .redis_state import redis_client
+
+
+CHANGES_CHANNEL = "proxypool:pool:changes"
+PUBLISHED_STATE_KEY = "proxypool:pool:published"
+SCORE_EPSILON = 0.01
+
+_logger = logging.getLogger(__name__)
+
+
+def _state(proxy: ProxyView) -> str:
+    return f"{proxy.score:.4f}|{proxy.status}"
+
+
+def _entry(proxy: ProxyView) -> Dict[str, Any]:
+    return {
+        "uri": proxy.uri,
+        "scheme": proxy.scheme,
+        "host": proxy.host,
+        "port": proxy.port,
+        "label": proxy.label,
+        "status": proxy.status,
+        "score": proxy.score,
+        "avg_latency_ms": proxy.avg_latency_ms,
+    }
+
+
+def diff_pool(previous: Dict[str, str], proxies: List[ProxyView]) -> Tuple[List[ProxyView], List[str], List[ProxyView]]:
+    """Return ``(added, removed, rescored)`` between the last published state and ``proxies``."""
+
+    added: List[ProxyView] = []
+    rescored: List[ProxyView] = []
+    current: Set[str] = set()
+    for proxy in proxies:
+        if proxy.uri in current:
+            continue
+        current.add(proxy.uri)
+        before = previous.get(proxy.uri)
+        if before is None:
+            added.append(proxy)
+            continue
+        score_s, _, status = before.partition("|")
+        if status != proxy.status or abs(float(score_s) - proxy.score) >= SCORE_EPSILON:
+            rescored.append(proxy)
+    removed = [uri for uri in previous if uri not in current]
+    return added, removed, rescored
+
+
+class RedisPoolChangePublisher(ProxyPublisher):
+    """Publishes pool diffs on a Redis channel each time a new pool generation is published."""
+
+    def __init__(self, store_factory: ProxyStoreFactory) -> None:
+        self._store_factory = store_factory
+
+    def publish(self, proxies: List[ProxyView]) -> None:
+        """Diff against the published state and write the diff, retrying if another publisher wins.
+
+        The state hash is ``WATCH``-ed from the read to the ``MULTI`` block, so two publishers
+        (the beat task and a manual fetch, say) never both emit a diff against the same state.
+        """
+        generation: Optional[int] = None
+        with redis_client().pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(PUBLISHED_STATE_KEY)
+                    raw = pipe.hgetall(PUBLISHED_STATE_KEY)
+                    previous = {k.decode(): v.decode() for k, v in raw.items()}
+                    added, removed, rescored = diff_pool(previous, proxies)
+                    if not (added or removed or rescored):
+                        pipe.unwatch()
+                        return
+                    if generation is None:
+                        generation = self._generation()
+                    message = json.dumps(
+                        {
+                            "generation": generation,
+                            "added": [_entry(p) for p in added],
+                            "removed": removed,
+                            "rescored": [_entry(p) for p in rescored],
+                        },
+                        separators=(",", ":"),
+                    )
+                    pipe.multi()
+                    if removed:
+                        pipe.hdel(PUBLISHED_STATE_KEY, *removed)
+                    changed = {p.uri: _state(p) for p in added + rescored}
+                    if changed:
+                        pipe.hset(PUBLISHED_STATE_KEY, mapping=changed)
+                    pipe.publish(CHANGES_CHANNEL, message)
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    def _generation(self) -> int:
+        store = self._store_factory()
+        try:
+            return store.generation()
+        finally:
+            store.close()
+
+
+class PoolChangeBroadcaster:
+    """Single Redis subscriber per API process fanning diffs out to SSE clients.
+
+    The subscription runs on a daemon thread and hands each message to every client's asyncio
+    queue on its own loop. A client that falls ``max_backlog`` messages behind is told to resync
+    and dropped rather than allowed to stall the others.
+    """
+
+    def __init__(self, max_backlog: int = 256) -> None:
+        self._max_backlog = max_backlog
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_backlog)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pool-change-feed", daemon=True)
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def is_subscribed(self, queue: asyncio.Queue) -> bool:
+        with self._lock:
+            return queue in self._subscribers
+
+    def _run(self) -> None:
+        while True:
+            try:
+                pubsub = redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANGES_CHANNEL)
+                for message in pubsub.listen():
+                    self._dispatch(message.get("data"))
+            except Exception:
+                _logger.exception("Pool change subscription failed; reconnecting")
+                self._dispatch(None)
+                time.sleep(2.0)
+
+    def _dispatch(self, payload: Optional[bytes]) -> None:
+        text = payload.decode() if isinstance(payload, bytes) else None
+        with self._lock:
+            targets = list(self._subscribers.items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, text)
+            except RuntimeError:
+                self.unsubscribe(queue)
+
+    def _offer(self, queue: asyncio.Queue, text: Optional[str]) -> None:
+        try:
+            queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.unsubscribe(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
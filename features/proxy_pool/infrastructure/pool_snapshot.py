@@ -0,0 +1,273 @@
+"""Columnar, memory-mapped snapshot of the ranked pool shared by every API process.
+
+The worker writes the file after each publish; API processes map it read-only and build
+:class:`ProxyRecord` rows straight from the mapping, so N uvicorn workers share one copy of the
+pool in the page cache instead of each querying and holding its own.
+
+Layout (native byte order, every column 8-byte aligned)::
+
+    header   magic, byte order, generation, count, blob size      (32 bytes)
+    int64    id, success_count, fail_count                        (count each)
+    float64  score, avg_latency_ms                                (count each)
+    int64    last_checked, last_ok, created_at, updated_at        (count each, µs since epoch)
+    uint32   string offsets: uri, scheme, host, label per row     (4 * count + 1)
+    int32    port                                                 (count)
+    uint8    status                                               (count)
+    bytes    UTF-8 string blob
+
+Rows are in ``(score DESC, id ASC)`` order, the same as ``ProxyStore.list_records``.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from features.proxy_pool.application.ports import ProxyStoreFactory
+from features.proxy_pool.domain.models import ProxyRecord, ProxyView
+
+
+MAGIC = b"PPSNAP01"
+_HEADER = struct.Struct("=8sBxxxQII4x")
+_LITTLE = 1 if sys.byteorder == "little" else 0
+_NULL_TIME = -(2**63)
+_EPOCH = datetime(1970, 1, 1)
+_STATUSES = ("unknown", "up", "down")
+_STATUS_CODES = {name: code for code, name in enumerate(_STATUSES)}
+_TIME_FIELDS = ("last_checked", "last_ok", "created_at", "updated_at")
+_new_record = tuple.__new__
+
+
+def _micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NULL_TIME
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _pad8(size: int) -> int:
+    return -size % 8
+
+
+def write_snapshot(path: Path, generation: int, records: Sequence[ProxyView]) -> None:
+    """Write ``records`` (already ranked) and atomically replace ``path`` with the result."""
+
+    ints = {name: array("q") for name in ("id", "success_count", "fail_count")}
+    floats = {name: array("d") for name in ("score", "avg_latency_ms")}
+    times = {name: array("q") for name in _TIME_FIELDS}
+    offsets = array("I", [0])
+    ports = array("i")
+    statuses = array("B")
+    blob = bytearray()
+    for r in records:
+        ints["id"].append(r.id or 0)
+        ints["success_count"].append(r.success_count)
+        ints["fail_count"].append(r.fail_count)
+        floats["score"].append(r.score)
+        floats["avg_latency_ms"].append(r.avg_latency_ms)
+        for name in _TIME_FIELDS:
+            times[name].append(_micros(getattr(r, name)))
+        for text in (r.uri, r.scheme, r.host, r.label or ""):
+            blob += text.encode("utf-8")
+            offsets.append(len(blob))
+        ports.append(r.port)
+        statuses.append(_STATUS_CODES.get(r.status, 0))
+
+    columns = [*ints.values(), *floats.values(), *times.values(), offsets, ports, statuses]
+    header = _HEADER.pack(MAGIC, _LITTLE, generation, len(records), len(blob))
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(header)
+        for column in columns:
+            raw = column.tobytes()
+            fh.write(raw)
+            fh.write(b"\0" * _pad8(len(raw)))
+        fh.write(blob)
+        fh.flush()
+        os.fsync(fh.fileno())
+    # Readers holding the old mapping keep the old inode; new readers see the whole new file.
+    os.replace(tmp, path)
+
+
+class MappedPoolSnapshot:
+    """Read-only view of one snapshot file; columns are memoryviews straight into the mapping.
+
+    Offers the ``generation``/``list_records``/``close`` subset of ``ProxyStore`` that
+    :class:`CandidateCache` needs, so it can stand in for the database there.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as fh:
+            stat = os.fstat(fh.fileno())
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        view = memoryview(self._mmap)
+        magic, byte_order, self._generation, count, blob_size = _HEADER.unpack_from(view)
+        if magic != MAGIC or byte_order != _LITTLE:
+            raise ValueError(f"{path} is not a pool snapshot for this platform")
+        self._count = count
+        position = _HEADER.size
+
+        def column(fmt: str, length: int) -> memoryview:
+            nonlocal position
+            size = struct.calcsize(fmt) * length
+            out = view[position:position + size].cast(fmt)
+            position += size + _pad8(size)
+            return out
+
+        self._ids = column("q", count)
+        self._success = column("q", count)
+        self._fail = column("q", count)
+        self._scores = column("d", count)
+        self._latency = column("d", count)
+        self._times = [column("q", count) for _ in _TIME_FIELDS]
+        self._offsets = column("I", 4 * count + 1)
+        self._ports = column("i", count)
+        self._statuses = column("B", count)
+        self._blob = view[position:position + blob_size]
+        if len(self._blob) != blob_size:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def generation(self) -> int:
+        return self._generation
+
+    def close(self) -> None:
+        # Mappings are dropped with the last reference; a request may still be reading this one.
+        pass
+
+    def _rows(self, start: int, stop: int) -> List[ProxyRecord]:
+        """Decode rows ``start:stop`` column by column; only this slice is ever turned into objects."""
+        if start >= stop:
+            return []
+        offsets = self._offsets[4 * start:4 * stop + 1].tolist()
+        blob = bytes(self._blob[offsets[0]:offsets[-1]])
+        base = offsets[0]
+        texts = [blob[a - base:b - base].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+        times = [
+            [None if v == _NULL_TIME else _EPOCH + timedelta(microseconds=v) for v in column[start:stop].tolist()]
+            for column in self._times
+        ]
+        return [
+            _new_record(ProxyRecord, row)
+            for row in zip(
+                self._ids[start:stop].tolist(),
+                texts[0::4],
+                texts[1::4],
+                texts[2::4],
+                self._ports[start:stop].tolist(),
+                [label or None for label in texts[3::4]],
+                [_STATUSES[code] for code in self._statuses[start:stop].tolist()],
+                self._scores[start:stop].tolist(),
+                self._success[start:stop].tolist(),
+                self._fail[start:stop].tolist(),
+                self._latency[start:stop].tolist(),
+                *times,
+            )
+        ]
+
+    def record(self, index: int) -> ProxyRecord:
+        return self._rows(index, index + 1)[0]
+
+    def _first(self, beyond: Callable[[int], bool]) -> int:
+        """First index for which ``beyond`` holds; rows are ranked so it flips exactly once."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if beyond(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def list_records(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        cursor: Optional[Tuple[float, int]] = None,
+    ) -> List[ProxyRecord]:
+        scores, ids = self._scores, self._ids
+        end = self._first(lambda i: scores[i] < min_score)
+        start = 0
+        if cursor is not None:
+            score, proxy_id = cursor
+            start = self._first(lambda i: scores[i] < score or (scores[i] == score and ids[i] > proxy_id))
+        return self._rows(start, min(end, start + limit))
+
+
+class PoolSnapshotReader:
+    """Process-wide handle that re-maps the snapshot when the worker replaces the file.
+
+    The file is ``stat``-ed at most once per ``check_interval``; a new inode, size or mtime
+    means a new snapshot, which is mapped and swapped in whole.
+    """
+
+    def __init__(self, path: Optional[Path], *, check_interval: float = 1.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self._path = path
+        self._check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[MappedPoolSnapshot] = None
+        self._checked_at = float("-inf")
+
+    def current(self) -> Optional[MappedPoolSnapshot]:
+        if self._path is None:
+            return None
+        now = self._clock()
+        if now - self._checked_at < self._check_interval:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at >= self._check_interval:
+                self._checked_at = now
+                self._snapshot = self._reload()
+        return self._snapshot
+
+    def _reload(self) -> Optional[MappedPoolSnapshot]:
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        current = self._snapshot
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return current
+        try:
+            return MappedPoolSnapshot(self._path)
+        except (OSError, ValueError):
+            return current
+
+
+class PoolSnapshotPublisher:
+    """ProxyPublisher that rewrites the snapshot file from the store rather than the published list.
+
+    The generation and the listing are two separate reads, with no transaction spanning them, so
+    a write landing in between leaves rows newer than the header. The generation is read first
+    so the header can only lag its rows, never run ahead of them: a reader that has seen the
+    newer generation treats the snapshot as behind and falls back to the store, and the next
+    publish catches the header up.
+    """
+
+    def __init__(self, path: Path, store_factory: ProxyStoreFactory, limit: int = 10000) -> None:
+        self._path = path
+        self._store_factory = store_factory
+        self._limit = limit
+
+    def publish(self, proxies: List[ProxyView]) -> None:
+        store = self._store_factory()
+        try:
+            # Generation before rows; see the class docstring.
+            generation = store.generation()
+            records = store.list_records(min_score=0.0, limit=self._limit)
+        finally:
+            store.close()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        write_snapshot(self._path, generation, records)
@@ -0,0 +1,145 @@
+"""Local listener ports leased to probes, without collisions between threads or processes.
+
+Every port is one byte of a shared lock file, at the port number's own offset, so processes
+configured with different ranges still agree on which byte guards which port. Leasing a port
+takes a non-blocking POSIX record lock on its byte, so health workers, the subscription
+scheduler and the collector skip ports another process holds, and the kernel drops the lease if
+its holder dies. Record locks belong to the whole process, so ports held by this process's
+other threads are tracked in memory as well; without ``fcntl`` only that in-process tracking
+applies.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import List, Optional, Set
+
+from .healthcheck import TEST_LISTEN_HOST
+from .settings import probe_port_lock_path, probe_port_range
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class PortLease:
+    """Ports held until :meth:`release`; may hold fewer than requested if the range ran out."""
+
+    def __init__(self, allocator: PortAllocator, ports: List[int]) -> None:
+        self._allocator = allocator
+        self.ports = ports
+
+    @property
+    def port(self) -> int:
+        return self.ports[0]
+
+    def release(self) -> None:
+        ports, self.ports = self.ports, []
+        self._allocator._release(ports)
+
+    def __enter__(self) -> PortLease:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class PortAllocator:
+    def __init__(self, lock_path: Path | str, first: int, last: int, *, host: str = TEST_LISTEN_HOST) -> None:
+        self._lock_path = str(lock_path)
+        self._first = first
+        self._span = last - first + 1
+        self._host = host
+        self._lock = threading.Lock()
+        self._held: Set[int] = set()
+        self._next = 0
+        self._fd: Optional[int] = None
+        self._pid = os.getpid()
+
+    def lease(self, count: int = 1) -> PortLease:
+        """Lease up to ``count`` ports that no other lease holds and that can currently be bound."""
+
+        ports: List[int] = []
+        with self._lock:
+            fd = self._descriptor()
+            for step in range(self._span):
+                if len(ports) >= count:
+                    break
+                port = self._first + (self._next + step) % self._span
+                if port in self._held or not self._try_lock(fd, port):
+                    continue
+                if not self._bindable(port):
+                    self._unlock(fd, port)
+                    continue
+                self._held.add(port)
+                ports.append(port)
+            if ports:
+                # Start the next scan after the last grant so released ports cool down before reuse.
+                self._next = (ports[-1] - self._first + 1) % self._span
+        return PortLease(self, ports)
+
+    def _release(self, ports: List[int]) -> None:
+        if not ports:
+            return
+        with self._lock:
+            fd = self._descriptor()
+            for port in ports:
+                if port in self._held:
+                    self._held.discard(port)
+                    self._unlock(fd, port)
+
+    def _descriptor(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        if self._pid != os.getpid():
+            # A forked child inherits neither the parent's record locks nor its leases.
+            self._pid = os.getpid()
+            self._fd = None
+            self._held.clear()
+        if self._fd is None:
+            # Kept open for the life of the process: closing any descriptor of the file would
+            # drop every record lock this process holds on it.
+            self._fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        return self._fd
+
+    @staticmethod
+    def _try_lock(fd: Optional[int], port: int) -> bool:
+        if fd is None:
+            return True
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, port)
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def _unlock(fd: Optional[int], port: int) -> None:
+        if fd is not None:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1, port)
+
+    def _bindable(self, port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if os.name != "nt":
+                # glider and mihomo listen with SO_REUSEADDR, so TIME_WAIT leftovers do not block them.
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((self._host, port))
+            except OSError:
+                return False
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def _allocator(lock_path: str, first: int, last: int) -> PortAllocator:
+    return PortAllocator(lock_path, first, last)
+
+
+def shared_port_allocator() -> PortAllocator:
+    """The process-wide allocator for ``PROBE_PORT_LOCK`` and ``PROBE_PORT_RANGE``."""
+
+    return _allocator(str(probe_port_lock_path()), *probe_port_range())
@@ -0,0 +1,58 @@
+"""Wait for a freshly started child process's listeners instead of sleeping a fixed time."""
+
+from __future__ import annotations
+
+import socket
+import subprocess
+import time
+from typing import Optional, Sequence
+
+from .metrics import PROBE_STARTUP_SECONDS
+
+
+def wait_for_listeners(
+    host: str,
+    ports: Sequence[int],
+    *,
+    timeout: float = 10.0,
+    proc: Optional[subprocess.Popen] = None,
+    launcher: str = "glider",
+    initial_interval: float = 0.005,
+    max_interval: float = 0.2,
+) -> bool:
+    """Connect-poll ``host:port`` for every port until all accept, with exponential backoff.
+
+    Returns ``False`` as soon as ``proc`` exits or once ``timeout`` seconds have passed. The
+    time spent is recorded per ``launcher`` so the saving over the old fixed sleeps is visible.
+    """
+
+    started = time.monotonic()
+    deadline = started + timeout
+    pending = list(ports)
+    interval = initial_interval
+    ready = False
+    try:
+        while True:
+            while pending and _accepts(host, pending[-1]):
+                pending.pop()
+            if not pending:
+                ready = True
+                return True
+            if (proc is not None and proc.poll() is not None) or time.monotonic() >= deadline:
+                return False
+            time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            interval = min(interval * 2, max_interval)
+    finally:
+        PROBE_STARTUP_SECONDS.observe(time.monotonic() - started, launcher=launcher, result="ready" if ready else "timeout")
+
+
+def wait_for_listener(host: str, port: int, **kwargs) -> bool:
+    return wait_for_listeners(host, [port], **kwargs)
+
+
+def _accepts(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
@@ -1,22 +1,92 @@
 from __future__ import annotations
 
 import os
-import json
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import redis
 
+from .metrics import REDIS_ROUND_TRIPS
+
+
+TOKEN_COUNT_KEY = "proxypool:token:{token}:count"
+DEFAULT_TOKEN_TTL = 86400
+
+# INCRBY and the first-touch EXPIRE run server-side, so a counter costs one round trip and can
+# never be left without a TTL if the client dies between the two commands.
+_INCR_WITH_TTL = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value == tonumber(ARGV[1]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_script_lock = threading.Lock()
+_incr_script: Optional[redis.commands.core.Script] = None
+
+
+def redis_url() -> str:
+    return os.environ.get("REDIS_URL", os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+
+
+def connection_pool(url: Optional[str] = None) -> redis.ConnectionPool:
+    target = url or redis_url()
+    pool = _pools.get(target)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(target)
+            if pool is None:
+                pool = redis.ConnectionPool.from_url(target)
+                _pools[target] = pool
+    return pool
+
 
 def redis_client() -> redis.Redis:
-    url = os.environ.get("REDIS_URL", os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"))
-    return redis.from_url(url)
+    return redis.Redis(connection_pool=connection_pool())
 
 
-def incr_token_count(token: str, ttl: int = 86400) -> int:
+def _incr_with_ttl(client: redis.Redis) -> redis.commands.core.Script:
+    global _incr_script
+    if _incr_script is None:
+        with _script_lock:
+            if _incr_script is None:
+                _incr_script = client.register_script(_INCR_WITH_TTL)
+    return _incr_script
+
+
+def incr_token_count(token: str, ttl: int = DEFAULT_TOKEN_TTL, amount: int = 1) -> int:
+    r = redis_client()
+    key = TOKEN_COUNT_KEY.format(token=token)
+    REDIS_ROUND_TRIPS.inc(op="incr")
+    return int(_incr_with_ttl(r)(keys=[key], args=[amount, ttl], client=r))
+
+
+def incr_token_counts(increments: Sequence[Tuple[str, int]], ttl: int = DEFAULT_TOKEN_TTL) -> List[int]:
+    """Increment several token counters in a single pipelined round trip.
+
+    Returns the post-increment value for each ``(token, amount)`` pair, in input order.
+    """
+
+    if not increments:
+        return []
     r = redis_client()
-    key = f"proxypool:token:{token}:count"
-    cnt = r.incr(key)
-    if cnt == 1:
-        r.expire(key, ttl)
-    return int(cnt)
+    script = _incr_with_ttl(r)
+    try:
+        return _pipelined_incr(r, script.sha, increments, ttl)
+    except redis.exceptions.NoScriptError:
+        # Server restarted or flushed its script cache; every EVALSHA failed, so nothing was applied.
+        REDIS_ROUND_TRIPS.inc(op="script_load")
+        r.script_load(script.script)
+        return _pipelined_incr(r, script.sha, increments, ttl)
+
 
+def _pipelined_incr(client: redis.Redis, sha: str, increments: Sequence[Tuple[str, int]], ttl: int) -> List[int]:
+    # Plain EVALSHA instead of Script objects: redis-py would prepend a SCRIPT EXISTS round trip.
+    REDIS_ROUND_TRIPS.inc(op="incr_batch")
+    pipe = client.pipeline(transaction=False)
+    for token, amount in increments:
+        pipe.evalsha(sha, 1, TOKEN_COUNT_KEY.format(token=token), amount, ttl)
+    return [int(value) for value in pipe.execute()]
@@ -1,20 +1,155 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Optional, Sequence
+import calendar
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
 
-from sqlalchemy import select, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import DateTime, Integer, and_, cast, delete, func, literal, or_, select, update
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.dialects import sqlite
 
-from .db import ProxyORM, SessionLocal
-from ..domain.models import Proxy
+from .db import (
+    CHANGES_FLOOR_KEY,
+    GENERATION_KEY,
+    PoolChangeORM,
+    PoolMetaORM,
+    ProbeRollupORM,
+    ProxyArchiveORM,
+    ProxyORM,
+    ProxyProbeORM,
+    SessionLocal,
+    engine,
+    writer_lock,
+)
+from .metrics import STORE_SECONDS
+from .settings import health_score_window_hours, probe_schedule
+from ..domain.models import (
+    EvictionPolicy,
+    EvictionResult,
+    PoolDelta,
+    ProbeCompaction,
+    ProbeRetention,
+    ProbeSchedule,
+    Proxy,
+    ProxyRecord,
+    UpsertResult,
+)
+
+
+T = TypeVar("T")
+
+HOURLY_WATERMARK_KEY = "probes_hourly_until"
+DAILY_WATERMARK_KEY = "probes_daily_until"
+# Bucket labels in the same text layout SQLAlchemy uses for SQLite DateTime columns, so they
+# compare and parse like any other stored timestamp.
+_BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+# Score moves smaller than this are probe noise and are not logged as ``rescored``.
+RESCORE_EPSILON = 0.01
+_DOMAIN_COLUMNS = tuple(ProxyORM.__table__.c[f.name] for f in fields(Proxy))
+# ``tuple.__new__`` copies a row straight into a record, skipping NamedTuple's keyword handling.
+_new_record = tuple.__new__
+
+
+_SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+def _chunks(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+_HEALTH_COLUMNS = (
+    ProxyORM.id,
+    ProxyORM.uri,
+    ProxyORM.status,
+    ProxyORM.score,
+    ProxyORM.success_count,
+    ProxyORM.fail_count,
+    ProxyORM.avg_latency_ms,
+    ProxyORM.last_checked,
+    ProxyORM.last_ok,
+    ProxyORM.score_volatility,
+)
+
+
+def _apply_probe(state: Dict[str, object], ok: bool, latency_ms: Optional[float], now: datetime) -> None:
+    if ok:
+        state["success_count"] += 1
+        state["status"] = "up"
+        state["last_ok"] = now
+        # latency EMA
+        if latency_ms is not None and latency_ms >= 0:
+            if state["avg_latency_ms"] < 0:
+                state["avg_latency_ms"] = latency_ms
+            else:
+                state["avg_latency_ms"] = 0.6 * state["avg_latency_ms"] + 0.4 * latency_ms
+    else:
+        state["fail_count"] += 1
+        # if many fails, mark down
+        if state["fail_count"] > 3 and state["success_count"] == 0:
+            state["status"] = "down"
+    state["last_checked"] = now
+    total = max(1, state["success_count"] + state["fail_count"])
+    state["score"] = _score(state["success_count"] / total, state["avg_latency_ms"])
+
+
+def _score(success_ratio: float, avg_latency_ms: float) -> float:
+    # score: success ratio minus latency factor
+    latency_penalty = 0.0
+    if avg_latency_ms >= 0:
+        latency_penalty = min(0.7, avg_latency_ms / 3000.0)  # cap penalty
+    return max(0.0, min(100.0, 100.0 * (success_ratio * (1.0 - latency_penalty))))
+
+
+def _schedule_probe(state: Dict[str, object], previous_score: float, schedule: ProbeSchedule, now: datetime) -> None:
+    state["score_volatility"] = 0.7 * state["score_volatility"] + 0.3 * abs(state["score"] - previous_score)
+    wait = schedule.max_seconds * schedule.volatility_ref / (schedule.volatility_ref + state["score_volatility"])
+    if state["status"] == "up" and state["score"] >= schedule.publish_score:
+        wait = min(wait, schedule.hot_seconds)
+    # +-10% by id, so proxies probed in one batch do not all fall due again in the same instant.
+    wait *= 0.9 + 0.2 * (state["id"] * 2654435761 % 1024) / 1024
+    state["next_due_at"] = now + timedelta(seconds=max(schedule.min_seconds, min(schedule.max_seconds, wait)))
+
+
+def _epoch(value: datetime) -> int:
+    return calendar.timegm(value.timetuple())
+
+
+def _timed(op: str):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STORE_SECONDS.time(op=op):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
 
 
 class ProxyRepository:
-    def __init__(self, session: Optional[Session] = None) -> None:
+    """SQLite :class:`ProxyStore`; dialect-specific SQL goes through ``_insert`` and ``_bucket``."""
+
+    # INSERT construct with ``on_conflict_do_update`` / ``excluded`` for this dialect.
+    _insert = staticmethod(sqlite.insert)
+
+    def __init__(
+        self,
+        session: Optional[Session] = None,
+        *,
+        score_window_hours: Optional[int] = None,
+        schedule: Optional[ProbeSchedule] = None,
+    ) -> None:
         self._session = session or SessionLocal()
+        self._score_window_hours = health_score_window_hours() if score_window_hours is None else score_window_hours
+        self._schedule = schedule or probe_schedule()
+        self._changes: List[Tuple[str, str]] = []
 
     def __enter__(self) -> ProxyRepository:
         return self
@@ -25,94 +160,587 @@ class ProxyRepository:
     def close(self) -> None:
         self._session.close()
 
-    def upsert_many(self, proxies: Sequence[Proxy]) -> int:
+    @contextmanager
+    def _writing(self, bump: bool = True) -> Iterator[None]:
+        """Write transaction under the cross-process writer lock, committing with a generation bump.
+
+        Changes noted with :meth:`_log_changes` inside the block always bump the generation and
+        are written to ``pool_changes`` under the new one, in the same transaction.
+        """
+        with writer_lock(self._session.get_bind()):
+            if self._session.in_transaction():
+                if self._session.new or self._session.dirty or self._session.deleted:
+                    raise RuntimeError("Session has pending ORM changes; flush them inside a write transaction")
+                # Drop the read snapshot and start from the latest commit; upgrading an older WAL
+                # read snapshot fails with BUSY_SNAPSHOT.
+                self._session.rollback()
+            self._changes = []
+            try:
+                yield
+                if bump or self._changes:
+                    generation = self._bump_generation()
+                    if self._changes:
+                        self._session.execute(
+                            self._insert(PoolChangeORM),
+                            [{"generation": generation, "uri": uri, "kind": kind} for uri, kind in self._changes],
+                        )
+                self._session.commit()
+            except Exception:
+                self._session.rollback()
+                raise
+            finally:
+                self._changes = []
+
+    def _log_changes(self, kind: str, uris) -> None:
+        self._changes.extend((uri, kind) for uri in uris)
+
+    def _bucket(self, period: str, column):
+        """Start of the ``hour``/``day`` bucket containing ``column``, comparable with stored timestamps."""
+        return func.strftime(_BUCKET_FORMATS[period], column)
+
+    @_timed("upsert_many")
+    def upsert_many(self, proxies: Sequence[Proxy]) -> UpsertResult:
+        """Insert new proxies and refresh the transport fields of known ones in one transaction.
+
+        A single ``INSERT .. ON CONFLICT`` is executed via executemany in chunks sized to SQLite's
+        bound parameter limit, which also bounds the ``IN`` list used to find pre-existing rows.
+        Duplicate URIs in the input collapse to their last occurrence, and URIs still held in
+        ``proxies_archive`` are skipped so evicted proxies are not re-imported by the next fetch.
+        """
         if not proxies:
-            return 0
-        count = 0
+            return UpsertResult()
+        latest: Dict[str, Proxy] = {}
         for p in proxies:
-            stmt = (
-                insert(ProxyORM)
-                .values(
-                    uri=p.uri,
-                    scheme=p.scheme,
-                    host=p.host,
-                    port=p.port,
-                    label=p.label,
+            latest[p.uri] = p
+        now = datetime.utcnow()
+        rows = [
+            {"uri": p.uri, "scheme": p.scheme, "host": p.host, "port": p.port, "label": p.label}
+            for p in latest.values()
+        ]
+        stmt = self._insert(ProxyORM)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProxyORM.uri],
+            set_={
+                "scheme": stmt.excluded.scheme,
+                "host": stmt.excluded.host,
+                "port": stmt.excluded.port,
+                "label": stmt.excluded.label,
+                "updated_at": now,
+            },
+        )
+        inserted = 0
+        updated = 0
+        with self._writing():
+            archived = set()
+            for chunk in _chunks(rows, _SQLITE_MAX_VARIABLES):
+                archived.update(
+                    self._session.execute(
+                        select(ProxyArchiveORM.uri).where(ProxyArchiveORM.uri.in_([row["uri"] for row in chunk]))
+                    ).scalars()
                 )
-                .on_conflict_do_update(
-                    index_elements=[ProxyORM.uri],
-                    set_={
-                        "scheme": p.scheme,
-                        "host": p.host,
-                        "port": p.port,
-                        "label": p.label,
-                        "updated_at": datetime.utcnow(),
-                    },
+            if archived:
+                rows = [row for row in rows if row["uri"] not in archived]
+            for chunk in _chunks(rows, _SQLITE_MAX_VARIABLES):
+                existing = set(
+                    self._session.execute(
+                        select(ProxyORM.uri).where(ProxyORM.uri.in_([row["uri"] for row in chunk]))
+                    ).scalars()
                 )
+                # One compiled statement run through the driver's executemany for the whole chunk.
+                self._session.execute(stmt, chunk)
+                self._log_changes("added", [row["uri"] for row in chunk if row["uri"] not in existing])
+                updated += len(existing)
+                inserted += len(chunk) - len(existing)
+        return UpsertResult(inserted=inserted, updated=updated)
+
+    def _listing(self, min_score: float, cursor: Optional[Tuple[float, int]] = None):
+        stmt = select(*_DOMAIN_COLUMNS).where(ProxyORM.score >= min_score)
+        if cursor is not None:
+            score, proxy_id = cursor
+            # The bare ``score <=`` bound keeps this a single range scan of ix_proxies_score_id in
+            # index order; the OR on its own would be planned as a multi-index OR plus a sort.
+            stmt = stmt.where(
+                ProxyORM.score <= score,
+                or_(ProxyORM.score < score, ProxyORM.id > proxy_id),
             )
-            self._session.execute(stmt)
-            count += 1
-        try:
-            self._session.commit()
-        except IntegrityError:
-            self._session.rollback()
-            raise
-        return count
+        return stmt.order_by(ProxyORM.score.desc(), ProxyORM.id.asc())
+
+    @_timed("list_records")
+    def list_records(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        cursor: Optional[Tuple[float, int]] = None,
+    ) -> List[ProxyRecord]:
+        """Read-only page in ``(score DESC, id ASC)`` order, built straight from row tuples.
 
+        Skips ORM entities and the identity map entirely; each row becomes one tuple-backed
+        :class:`ProxyRecord`.
+        """
+        rows = self._session.connection().execute(self._listing(min_score, cursor).limit(limit))
+        return [_new_record(ProxyRecord, row) for row in rows]
+
+    @_timed("list")
     def list(self, min_score: float = 0.0, limit: int = 200) -> List[Proxy]:
+        return [record.to_proxy() for record in self.list_records(min_score, limit)]
+
+    @_timed("list_after")
+    def list_after(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        cursor: Optional[Tuple[float, int]] = None,
+    ) -> List[Proxy]:
+        """Keyset page in ``(score DESC, id ASC)`` order, starting strictly after ``cursor``."""
+        return [record.to_proxy() for record in self.list_records(min_score, limit, cursor)]
+
+    @_timed("list_stale")
+    def list_stale(self, checked_before: datetime, limit: int = 200) -> List[Proxy]:
+        """Never-checked proxies first (NULL sorts lowest), then the least recently checked."""
         rows = self._session.execute(
-            select(ProxyORM).where(ProxyORM.score >= min_score).order_by(ProxyORM.score.desc(), ProxyORM.id.asc()).limit(limit)
-        ).scalars().all()
-        return [self._to_domain(x) for x in rows]
+            select(*_DOMAIN_COLUMNS)
+            .where(or_(ProxyORM.last_checked.is_(None), ProxyORM.last_checked < checked_before))
+            .order_by(ProxyORM.last_checked.asc(), ProxyORM.id.asc())
+            .limit(limit)
+        )
+        return [Proxy(*row) for row in rows]
+
+    @_timed("count_by_status")
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._session.execute(
+            select(ProxyORM.status, func.count()).group_by(ProxyORM.status)
+        ).all()
+        return {status: int(count) for status, count in rows}
+
+    def iter_all(self, min_score: float = 0.0, batch_size: int = 1000) -> Iterator[Proxy]:
+        """Stream every proxy in score order through a server-side cursor.
+
+        Rows are read as plain tuples in ``batch_size`` chunks so neither the identity map nor the
+        result buffer grows with the table. Only time spent fetching counts towards
+        ``STORE_SECONDS``, not time the caller spends between rows.
+        """
+        started = perf_counter()
+        stmt = self._listing(min_score).execution_options(stream_results=True, yield_per=batch_size)
+        result = self._session.execute(stmt)
+        elapsed = 0.0
+        try:
+            for partition in result.partitions(batch_size):
+                elapsed += perf_counter() - started
+                for row in partition:
+                    yield Proxy(*row)
+                started = perf_counter()
+            elapsed += perf_counter() - started
+        finally:
+            result.close()
+            STORE_SECONDS.observe(elapsed, op="iter_all")
 
+    @_timed("get_by_uri")
     def get_by_uri(self, uri: str) -> Optional[Proxy]:
-        row = self._session.execute(select(ProxyORM).where(ProxyORM.uri == uri)).scalar_one_or_none()
-        return self._to_domain(row) if row else None
+        row = self._session.execute(select(*_DOMAIN_COLUMNS).where(ProxyORM.uri == uri)).first()
+        return Proxy(*row) if row else None
+
+    def _claim_query(self, limit: int, checked_before: datetime, now: datetime):
+        return (
+            select(*_DOMAIN_COLUMNS)
+            .where(
+                or_(ProxyORM.next_due_at.is_(None), ProxyORM.next_due_at <= now),
+                or_(ProxyORM.last_checked.is_(None), ProxyORM.last_checked < checked_before),
+                or_(ProxyORM.lease_until.is_(None), ProxyORM.lease_until < now),
+            )
+            .order_by(ProxyORM.next_due_at.asc().nulls_first(), ProxyORM.id.asc())
+            .limit(limit)
+            # Rows another worker is claiming are skipped rather than waited on. SQLite ignores
+            # this and relies on the writer lock, which makes the whole claim exclusive.
+            .with_for_update(skip_locked=True)
+        )
+
+    @_timed("claim_for_probe")
+    def claim_for_probe(self, limit: int, checked_before: datetime, lease_seconds: float = 600.0) -> List[Proxy]:
+        """Lease up to ``limit`` due proxies not checked since ``checked_before``, earliest due first.
+
+        A proxy is due once its ``next_due_at`` has passed, which every recorded probe pushes out
+        according to the :class:`ProbeSchedule`; proxies never probed are due at once.
+
+        Claimed rows stay invisible to other claims until their probe results are recorded or the
+        lease runs out, so concurrent health workers split the pool instead of probing it twice.
+        """
+        now = datetime.utcnow()
+        with self._writing(bump=False):
+            claimed = [Proxy(*row) for row in self._session.execute(self._claim_query(limit, checked_before, now))]
+            for chunk in _chunks([proxy.id for proxy in claimed], _SQLITE_MAX_VARIABLES):
+                self._session.execute(
+                    update(ProxyORM)
+                    .where(ProxyORM.id.in_(chunk))
+                    .values(lease_until=now + timedelta(seconds=lease_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+        return claimed
 
+    @_timed("update_health")
     def update_health(self, uri: str, ok: bool, latency_ms: Optional[float]) -> None:
-        row = self._session.execute(select(ProxyORM).where(ProxyORM.uri == uri)).scalar_one_or_none()
-        if not row:
-            return
-        if ok:
-            row.success_count += 1
-            row.status = "up"
-            row.last_ok = datetime.utcnow()
-            # latency EMA
-            if latency_ms is not None and latency_ms >= 0:
-                if row.avg_latency_ms < 0:
-                    row.avg_latency_ms = latency_ms
-                else:
-                    row.avg_latency_ms = 0.6 * row.avg_latency_ms + 0.4 * latency_ms
-        else:
-            row.fail_count += 1
-            # if many fails, mark down
-            row.status = "down" if row.fail_count > 3 and row.success_count == 0 else row.status
-        row.last_checked = datetime.utcnow()
-        # score: success ratio minus latency factor
-        total = max(1, row.success_count + row.fail_count)
-        success_ratio = row.success_count / total
-        latency_penalty = 0.0
-        if row.avg_latency_ms >= 0:
-            latency_penalty = min(0.7, row.avg_latency_ms / 3000.0)  # cap penalty
-        score = max(0.0, min(100.0, 100.0 * (success_ratio * (1.0 - latency_penalty))))
-        row.score = score
-        self._session.commit()
-
-    def _to_domain(self, orm: ProxyORM) -> Proxy:
-        return Proxy(
-            id=orm.id,
-            uri=orm.uri,
-            scheme=orm.scheme,
-            host=orm.host,
-            port=orm.port,
-            label=orm.label,
-            status=orm.status,
-            score=orm.score,
-            success_count=orm.success_count,
-            fail_count=orm.fail_count,
-            avg_latency_ms=orm.avg_latency_ms,
-            last_checked=orm.last_checked,
-            last_ok=orm.last_ok,
-            created_at=orm.created_at,
-            updated_at=orm.updated_at,
+        self.record_health_batch([(uri, ok, latency_ms)])
+
+    @_timed("record_health_batch")
+    def record_health_batch(self, results: Sequence[Tuple[str, bool, Optional[float]]]) -> int:
+        """Apply many probe results with one read per chunk, one executemany UPDATE and one commit.
+
+        Results for the same URI are applied in order. Returns the number of rows updated.
+        """
+        if not results:
+            return 0
+        uris = list({uri for uri, _, _ in results})
+        updated = 0
+        with self._writing():
+            states: Dict[str, Dict[str, object]] = {}
+            for chunk in _chunks(uris, _SQLITE_MAX_VARIABLES):
+                rows = self._session.execute(
+                    select(*_HEALTH_COLUMNS).where(ProxyORM.uri.in_(chunk))
+                ).all()
+                for row in rows:
+                    states[row.uri] = dict(row._mapping)
+            before = {uri: (state["score"], state["status"]) for uri, state in states.items()}
+            now = datetime.utcnow()
+            touched: Dict[str, Dict[str, object]] = {}
+            for uri, ok, latency_ms in results:
+                state = states.get(uri)
+                if state is None:
+                    continue
+                _apply_probe(state, ok, latency_ms, now)
+                touched[uri] = state
+            probes = [
+                {"proxy_id": states[uri]["id"], "ts": now, "ok": ok, "latency_ms": latency_ms}
+                for uri, ok, latency_ms in results
+                if uri in states
+            ]
+            if probes:
+                self._session.execute(self._insert(ProxyProbeORM), probes)
+            if touched and self._score_window_hours > 0:
+                self._apply_windowed_scores(touched.values(), now)
+            for uri, state in touched.items():
+                _schedule_probe(state, before[uri][0], self._schedule, now)
+            if touched:
+                params = [
+                    {key: value for key, value in state.items() if key != "uri"}
+                    | {"updated_at": now, "lease_until": None}
+                    for state in touched.values()
+                ]
+                # ORM bulk UPDATE keyed on the primary key runs as a single executemany.
+                self._session.execute(update(ProxyORM), params)
+                updated = len(params)
+                self._log_changes(
+                    "rescored",
+                    [
+                        uri
+                        for uri, state in touched.items()
+                        if state["status"] != before[uri][1] or abs(state["score"] - before[uri][0]) >= RESCORE_EPSILON
+                    ],
+                )
+        return updated
+
+    def _apply_windowed_scores(self, states, now: datetime) -> None:
+        """Replace lifetime success ratios with the ratio over the last ``score_window_hours``.
+
+        Whole hours already compacted are read from the hourly rollups; newer probes, including
+        the ones just inserted, come from ``proxy_probes``.
+        """
+        since = (now - timedelta(hours=self._score_window_hours)).replace(minute=0, second=0, microsecond=0)
+        rolled_until = self._meta_time(HOURLY_WATERMARK_KEY)
+        raw_since = max(since, rolled_until) if rolled_until else since
+        by_id = {state["id"]: state for state in states}
+        totals: Dict[int, List[int]] = {}
+        ids = list(by_id)
+        for chunk in _chunks(ids, _SQLITE_MAX_VARIABLES):
+            queries = [
+                select(
+                    ProxyProbeORM.proxy_id,
+                    func.count(),
+                    func.sum(cast(ProxyProbeORM.ok, Integer)),
+                )
+                .where(ProxyProbeORM.proxy_id.in_(chunk), ProxyProbeORM.ts >= raw_since)
+                .group_by(ProxyProbeORM.proxy_id)
+            ]
+            if rolled_until and rolled_until > since:
+                queries.append(
+                    select(ProbeRollupORM.proxy_id, func.sum(ProbeRollupORM.probes), func.sum(ProbeRollupORM.successes))
+                    .where(
+                        ProbeRollupORM.proxy_id.in_(chunk),
+                        ProbeRollupORM.period == "hour",
+                        ProbeRollupORM.bucket >= since,
+                        ProbeRollupORM.bucket < rolled_until,
+                    )
+                    .group_by(ProbeRollupORM.proxy_id)
+                )
+            for query in queries:
+                for proxy_id, count, successes in self._session.execute(query):
+                    pair = totals.setdefault(proxy_id, [0, 0])
+                    pair[0] += int(count or 0)
+                    pair[1] += int(successes or 0)
+        for proxy_id, (count, successes) in totals.items():
+            if count:
+                state = by_id[proxy_id]
+                state["score"] = _score(successes / count, state["avg_latency_ms"])
+
+    @_timed("compact_probes")
+    def compact_probes(self, retention: ProbeRetention, now: Optional[datetime] = None) -> ProbeCompaction:
+        """Roll finished hours and days of probe history up a level, then expire old rows.
+
+        Watermarks in ``pool_meta`` record how far each level has been rolled, so a run only
+        aggregates new rows and raw probes or hourly buckets are never deleted before they have
+        been counted one level up.
+        """
+        now = now or datetime.utcnow()
+        hour_floor = now.replace(minute=0, second=0, microsecond=0)
+        day_floor = hour_floor.replace(hour=0)
+        with self._writing(bump=False):
+            rolled_hourly = self._roll_up(
+                select(
+                    ProxyProbeORM.proxy_id,
+                    literal("hour"),
+                    self._bucket("hour", ProxyProbeORM.ts),
+                    func.count(),
+                    func.sum(cast(ProxyProbeORM.ok, Integer)),
+                    func.coalesce(func.sum(ProxyProbeORM.latency_ms), 0.0),
+                    func.count(ProxyProbeORM.latency_ms),
+                ),
+                ProxyProbeORM.ts,
+                HOURLY_WATERMARK_KEY,
+                hour_floor,
+                group_by=(ProxyProbeORM.proxy_id, self._bucket("hour", ProxyProbeORM.ts)),
+            )
+            rolled_daily = self._roll_up(
+                select(
+                    ProbeRollupORM.proxy_id,
+                    literal("day"),
+                    self._bucket("day", ProbeRollupORM.bucket),
+                    func.sum(ProbeRollupORM.probes),
+                    func.sum(ProbeRollupORM.successes),
+                    func.sum(ProbeRollupORM.latency_sum),
+                    func.sum(ProbeRollupORM.latency_count),
+                ).where(ProbeRollupORM.period == "hour"),
+                ProbeRollupORM.bucket,
+                DAILY_WATERMARK_KEY,
+                day_floor,
+                group_by=(ProbeRollupORM.proxy_id, self._bucket("day", ProbeRollupORM.bucket)),
+            )
+            deleted_raw = self._session.execute(
+                delete(ProxyProbeORM).where(
+                    ProxyProbeORM.ts < min(now - timedelta(hours=retention.raw_hours), hour_floor)
+                )
+            ).rowcount
+            deleted_hourly = self._session.execute(
+                delete(ProbeRollupORM).where(
+                    ProbeRollupORM.period == "hour",
+                    ProbeRollupORM.bucket < min(now - timedelta(days=retention.hourly_days), day_floor),
+                )
+            ).rowcount
+            deleted_daily = self._session.execute(
+                delete(ProbeRollupORM).where(
+                    ProbeRollupORM.period == "day",
+                    ProbeRollupORM.bucket < now - timedelta(days=retention.daily_days),
+                )
+            ).rowcount
+        return ProbeCompaction(
+            rolled_hourly=rolled_hourly,
+            rolled_daily=rolled_daily,
+            deleted_raw=deleted_raw,
+            deleted_hourly=deleted_hourly,
+            deleted_daily=deleted_daily,
+        )
+
+    @_timed("evict_dead")
+    def evict_dead(self, policy: EvictionPolicy, now: Optional[datetime] = None) -> EvictionResult:
+        """Move proxies that keep failing and have not succeeded for ``stale_days`` to the archive.
+
+        Their probe history goes with them. Archive rows older than ``archive_retention_days``
+        are dropped, which lets a URI that is still listed upstream be imported and probed
+        again. Freed pages are then returned to the filesystem with an incremental VACUUM.
+        """
+        now = now or datetime.utcnow()
+        dead = and_(
+            ProxyORM.last_checked.is_not(None),
+            ProxyORM.fail_count >= policy.min_failures,
+            func.coalesce(ProxyORM.last_ok, ProxyORM.created_at) < now - timedelta(days=policy.stale_days),
         )
+        dead_ids = select(ProxyORM.id).where(dead).scalar_subquery()
+        archive_columns = [
+            "uri", "scheme", "host", "port", "label", "score", "success_count", "fail_count",
+            "last_checked", "last_ok", "created_at",
+        ]
+        with self._writing(bump=False):
+            rows = self._session.execute(
+                select(ProxyORM.uri, ProxyORM.last_checked, ProxyORM.next_due_at).where(dead)
+            ).all()
+            self._log_changes("removed", [row.uri for row in rows])
+            stmt = self._insert(ProxyArchiveORM).from_select(
+                archive_columns + ["archived_at"],
+                select(*(ProxyORM.__table__.c[name] for name in archive_columns), literal(now, DateTime)).where(dead),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ProxyArchiveORM.uri],
+                set_={name: stmt.excluded[name] for name in archive_columns[1:] + ["archived_at"]},
+            )
+            self._session.execute(stmt)
+            self._session.execute(delete(ProxyProbeORM).where(ProxyProbeORM.proxy_id.in_(dead_ids)))
+            self._session.execute(delete(ProbeRollupORM).where(ProbeRollupORM.proxy_id.in_(dead_ids)))
+            archived = self._session.execute(delete(ProxyORM).where(dead)).rowcount
+            expired = self._session.execute(
+                delete(ProxyArchiveORM).where(
+                    ProxyArchiveORM.archived_at < now - timedelta(days=policy.archive_retention_days)
+                )
+            ).rowcount
+        pages_freed = self._reclaim_space(policy.vacuum_pages) if archived or expired else 0
+        return EvictionResult(
+            archived=archived,
+            expired_archive=expired,
+            pages_freed=pages_freed,
+            probes_saved_per_cycle=self._probes_per_cycle(rows),
+        )
+
+    def _probes_per_cycle(self, rows) -> int:
+        """Probes ``rows`` were due per ``max_seconds`` window, at the interval each was last scheduled."""
+
+        schedule = self._schedule
+        total = 0.0
+        for row in rows:
+            if row.next_due_at is None:
+                # Never scheduled (rows from before due-time probing): due on every pass.
+                interval = schedule.min_seconds
+            else:
+                interval = (row.next_due_at - row.last_checked).total_seconds()
+            total += schedule.max_seconds / max(schedule.min_seconds, min(schedule.max_seconds, interval))
+        return round(total)
+
+    def _reclaim_space(self, max_pages: int) -> int:
+        """Release free pages with ``incremental_vacuum``; returns how many were released.
+
+        Databases created before auto_vacuum was enabled get one full VACUUM to switch them to
+        incremental mode. Both run through ``executescript``: neither may run inside a
+        transaction, and a plain ``execute`` steps ``incremental_vacuum`` only once (one page).
+        """
+        bind = self._session.get_bind()
+        if bind.dialect.name != "sqlite":
+            return 0
+        with writer_lock(bind), bind.connect() as conn:
+            raw = conn.execution_options(isolation_level="AUTOCOMMIT").connection.driver_connection
+            before = raw.execute("PRAGMA freelist_count").fetchone()[0]
+            if raw.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                raw.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+            else:
+                raw.executescript(f"PRAGMA incremental_vacuum({max_pages})" if max_pages else "PRAGMA incremental_vacuum")
+            return before - raw.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def _roll_up(self, source, ts_column, watermark_key: str, until: datetime, *, group_by) -> int:
+        """Aggregate ``source`` rows in ``[watermark, until)`` into rollup buckets, adding to existing ones."""
+        since = self._meta_time(watermark_key)
+        if since is not None and since >= until:
+            return 0
+        source = source.where(ts_column < until)
+        if since is not None:
+            source = source.where(ts_column >= since)
+        stmt = self._insert(ProbeRollupORM).from_select(
+            ["proxy_id", "period", "bucket", "probes", "successes", "latency_sum", "latency_count"],
+            source.group_by(*group_by),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProbeRollupORM.proxy_id, ProbeRollupORM.period, ProbeRollupORM.bucket],
+            set_={
+                "probes": ProbeRollupORM.probes + stmt.excluded.probes,
+                "successes": ProbeRollupORM.successes + stmt.excluded.successes,
+                "latency_sum": ProbeRollupORM.latency_sum + stmt.excluded.latency_sum,
+                "latency_count": ProbeRollupORM.latency_count + stmt.excluded.latency_count,
+            },
+        )
+        rolled = self._session.execute(stmt).rowcount
+        self._set_meta(watermark_key, _epoch(until))
+        return rolled
+
+    def _meta(self, key: str) -> Optional[int]:
+        return self._session.execute(
+            select(PoolMetaORM.value).where(PoolMetaORM.key == key)
+        ).scalar_one_or_none()
+
+    def _meta_time(self, key: str) -> Optional[datetime]:
+        value = self._meta(key)
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None) if value is not None else None
+
+    def _set_meta(self, key: str, value: int) -> None:
+        stmt = self._insert(PoolMetaORM).values(key=key, value=value)
+        self._session.execute(
+            stmt.on_conflict_do_update(index_elements=[PoolMetaORM.key], set_={"value": stmt.excluded.value})
+        )
+
+    @_timed("generation")
+    def generation(self) -> int:
+        return int(self._meta(GENERATION_KEY) or 0)
+
+    def _bump_generation(self) -> int:
+        # Runs inside the caller's transaction so readers never observe new rows with a stale generation.
+        stmt = (
+            self._insert(PoolMetaORM)
+            .values(key=GENERATION_KEY, value=1)
+            .on_conflict_do_update(
+                index_elements=[PoolMetaORM.key],
+                set_={"value": PoolMetaORM.value + 1},
+            )
+        )
+        self._session.execute(stmt)
+        return int(self._meta(GENERATION_KEY))
+
+    @_timed("changes_since")
+    def changes_since(self, since: int) -> Optional[PoolDelta]:
+        """Net changes after generation ``since``, or ``None`` if the log no longer reaches back that far.
+
+        Each URI is reported once: a proxy added and evicted again inside the range is left out,
+        and one added then rescored is reported as added with its current row.
+        """
+        generation = self.generation()
+        history: Dict[str, List[str]] = {}
+        rows = self._session.execute(
+            select(PoolChangeORM.uri, PoolChangeORM.kind)
+            .where(PoolChangeORM.generation > since, PoolChangeORM.generation <= generation)
+            .order_by(PoolChangeORM.id)
+        )
+        for uri, kind in rows:
+            kinds = history.setdefault(uri, [kind, kind])
+            kinds[1] = kind
+        # Read after the changes so a concurrent prune cannot hand out a delta with a hole in it.
+        if since > generation or since < (self._meta(CHANGES_FLOOR_KEY) or 0):
+            return None
+        current: Dict[str, ProxyRecord] = {}
+        live = [uri for uri, (_, last) in history.items() if last != "removed"]
+        for chunk in _chunks(live, _SQLITE_MAX_VARIABLES):
+            for row in self._session.execute(select(*_DOMAIN_COLUMNS).where(ProxyORM.uri.in_(chunk))):
+                current[row.uri] = _new_record(ProxyRecord, row)
+        delta = PoolDelta(since=since, generation=generation, added=[], removed=[], rescored=[])
+        for uri, (first, _) in history.items():
+            record = current.get(uri)
+            if record is None:
+                if first != "added":
+                    delta.removed.append(uri)
+            elif first == "added":
+                delta.added.append(record)
+            else:
+                delta.rescored.append(record)
+        return delta
+
+    @_timed("prune_changes")
+    def prune_changes(self, keep_generations: int) -> int:
+        """Drop change rows more than ``keep_generations`` behind the current generation."""
+        with self._writing(bump=False):
+            floor = self.generation() - keep_generations
+            if floor <= (self._meta(CHANGES_FLOOR_KEY) or 0):
+                return 0
+            deleted = self._session.execute(
+                delete(PoolChangeORM).where(PoolChangeORM.generation <= floor)
+            ).rowcount
+            self._set_meta(CHANGES_FLOOR_KEY, floor)
+        return deleted
+
+
+def repository_class(bind: Optional[Engine] = None) -> Type[ProxyRepository]:
+    """The :class:`ProxyStore` implementation for ``bind``'s database (``DATABASE_URL`` by default)."""
+    if (bind or engine).dialect.name == "postgresql":
+        from .pg_repository import PostgresProxyRepository
+
+        return PostgresProxyRepository
+    return ProxyRepository
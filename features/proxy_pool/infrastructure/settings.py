@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Final
+from typing import Final, Optional, Tuple
+
+from ..domain.models import EvictionPolicy, ProbeRetention, ProbeSchedule
 
 
 ENV_FILE: Final[Path] = Path(".env")
@@ -10,6 +14,19 @@ DEFAULT_GLIDER_HTTP_PORT: Final[str] = "10707"
 DEFAULT_GLIDER_ALT_PORT: Final[str] = "10710"
 DEFAULT_SCORE_THRESHOLD: Final[float] = 60.0
 DEFAULT_GLIDER_MAX_PUBLISH: Final[int] = 200
+DEFAULT_ROTATE_CANDIDATE_LIMIT: Final[int] = 200
+DEFAULT_POOL_SNAPSHOT_TTL: Final[float] = 1.0
+DEFAULT_WEIGHT_SCORE_EXPONENT: Final[float] = 1.0
+DEFAULT_WEIGHT_LATENCY_REF_MS: Final[float] = 1000.0
+DEFAULT_HEALTH_SCORE_WINDOW_HOURS: Final[int] = 0
+DEFAULT_PROBE_LEASE_SECONDS: Final[int] = 600
+DEFAULT_POOL_SNAPSHOT_LIMIT: Final[int] = 10000
+DEFAULT_POOL_CHANGES_RETENTION: Final[int] = 10000
+DEFAULT_PROBE_HOST_BATCH: Final[int] = 1000
+DEFAULT_PROBE_HOST_CONCURRENCY: Final[int] = 1000
+DEFAULT_PROBE_PER_HOST_LIMIT: Final[int] = 16
+DEFAULT_PROBE_BUDGET: Final[int] = 10000
+DEFAULT_PROBE_PORT_RANGE: Final[Tuple[int, int]] = (18081, 28080)
 
 
 def _load_env_file() -> None:
@@ -92,3 +109,197 @@ def glider_max_publish() -> int:
     except (TypeError, ValueError):
         return DEFAULT_GLIDER_MAX_PUBLISH
     return max(0, value)
+
+
+def rotate_candidate_limit() -> int:
+    raw = os.getenv("ROTATE_CANDIDATE_LIMIT")
+    if raw is None:
+        return DEFAULT_ROTATE_CANDIDATE_LIMIT
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_ROTATE_CANDIDATE_LIMIT
+    return max(1, value)
+
+
+def pool_snapshot_ttl() -> float:
+    raw = os.getenv("POOL_SNAPSHOT_TTL")
+    if raw is None:
+        return DEFAULT_POOL_SNAPSHOT_TTL
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_POOL_SNAPSHOT_TTL
+    return max(0.0, value)
+
+
+def rotate_weight_score_exponent() -> float:
+    raw = os.getenv("ROTATE_WEIGHT_SCORE_EXPONENT")
+    if raw is None:
+        return DEFAULT_WEIGHT_SCORE_EXPONENT
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_WEIGHT_SCORE_EXPONENT
+    return max(0.0, value)
+
+
+def rotate_weight_latency_ref_ms() -> float:
+    raw = os.getenv("ROTATE_WEIGHT_LATENCY_REF_MS")
+    if raw is None:
+        return DEFAULT_WEIGHT_LATENCY_REF_MS
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_WEIGHT_LATENCY_REF_MS
+    return value if value > 0 else DEFAULT_WEIGHT_LATENCY_REF_MS
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 65536
+    serialize_writers: bool = True
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(0, int(raw))
+    except (TypeError, ValueError):
+        return default
+
+
+def sqlite_profile() -> SqliteProfile:
+    defaults = SqliteProfile()
+    journal_mode = os.getenv("SQLITE_JOURNAL_MODE", defaults.journal_mode).strip().upper()
+    if journal_mode not in {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}:
+        journal_mode = defaults.journal_mode
+    synchronous = os.getenv("SQLITE_SYNCHRONOUS", defaults.synchronous).strip().upper()
+    if synchronous not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+        synchronous = defaults.synchronous
+    return SqliteProfile(
+        journal_mode=journal_mode,
+        synchronous=synchronous,
+        busy_timeout_ms=_env_int("SQLITE_BUSY_TIMEOUT_MS", defaults.busy_timeout_ms),
+        mmap_size=_env_int("SQLITE_MMAP_SIZE", defaults.mmap_size),
+        cache_size_kib=_env_int("SQLITE_CACHE_SIZE_KIB", defaults.cache_size_kib),
+        serialize_writers=os.getenv("SQLITE_SERIALIZE_WRITERS", "1").strip().lower() not in {"0", "false", "no"},
+    )
+
+
+def probe_retention() -> ProbeRetention:
+    defaults = ProbeRetention()
+    return ProbeRetention(
+        raw_hours=max(1, _env_int("PROBE_RAW_RETENTION_HOURS", defaults.raw_hours)),
+        hourly_days=max(1, _env_int("PROBE_HOURLY_RETENTION_DAYS", defaults.hourly_days)),
+        daily_days=max(1, _env_int("PROBE_DAILY_RETENTION_DAYS", defaults.daily_days)),
+    )
+
+
+def health_score_window_hours() -> int:
+    """Hours of probe history the score's success rate is computed over; 0 keeps lifetime counters."""
+
+    return _env_int("HEALTH_SCORE_WINDOW_HOURS", DEFAULT_HEALTH_SCORE_WINDOW_HOURS)
+
+
+def probe_lease_seconds() -> int:
+    """How long a claimed probe batch stays reserved for the worker that claimed it."""
+
+    return max(1, _env_int("HEALTHCHECK_LEASE_SECONDS", DEFAULT_PROBE_LEASE_SECONDS))
+
+
+def probe_budget() -> int:
+    """Most proxies one health-check pass probes; only due proxies are probed at all."""
+
+    return max(1, _env_int("HEALTHCHECK_PROBE_BUDGET", DEFAULT_PROBE_BUDGET))
+
+
+def probe_schedule() -> ProbeSchedule:
+    defaults = ProbeSchedule()
+    min_seconds = max(1, _env_int("HEALTHCHECK_MIN_INTERVAL", defaults.min_seconds))
+    max_seconds = max(min_seconds, _env_int("HEALTHCHECK_MAX_INTERVAL", defaults.max_seconds))
+    return ProbeSchedule(
+        min_seconds=min_seconds,
+        hot_seconds=max(min_seconds, _env_int("HEALTHCHECK_HOT_INTERVAL", defaults.hot_seconds)),
+        max_seconds=max_seconds,
+        volatility_ref=defaults.volatility_ref,
+        publish_score=glider_score_threshold(),
+    )
+
+
+def eviction_policy() -> EvictionPolicy:
+    defaults = EvictionPolicy()
+    return EvictionPolicy(
+        min_failures=max(1, _env_int("PROXY_GC_MIN_FAILURES", defaults.min_failures)),
+        stale_days=max(1, _env_int("PROXY_GC_STALE_DAYS", defaults.stale_days)),
+        archive_retention_days=max(1, _env_int("PROXY_ARCHIVE_RETENTION_DAYS", defaults.archive_retention_days)),
+        vacuum_pages=_env_int("PROXY_GC_VACUUM_PAGES", defaults.vacuum_pages),
+    )
+
+
+def pool_snapshot_path() -> Optional[Path]:
+    """Where the worker publishes the mmap pool snapshot; ``POOL_SNAPSHOT_PATH=off`` disables it.
+
+    Defaults to ``pool.snapshot`` next to the SQLite file, which the API and worker already share.
+    """
+
+    raw = os.getenv("POOL_SNAPSHOT_PATH")
+    if raw is None:
+        db_path = os.getenv("PROXYPOOL_DB", os.path.join(os.getcwd(), "data.db"))
+        return Path(db_path).parent / "pool.snapshot"
+    raw = raw.strip()
+    if raw.lower() in {"", "0", "off", "false", "no"}:
+        return None
+    return Path(raw)
+
+
+def pool_snapshot_limit() -> int:
+    return max(1, _env_int("POOL_SNAPSHOT_LIMIT", DEFAULT_POOL_SNAPSHOT_LIMIT))
+
+
+def pool_changes_retention() -> int:
+    """How many generations of the change log ``/api/proxies/changes`` can reach back over."""
+
+    return max(1, _env_int("POOL_CHANGES_RETENTION", DEFAULT_POOL_CHANGES_RETENTION))
+
+
+def probe_host_batch_size() -> int:
+    """Proxies probed per mihomo probe-host process (one local listener each)."""
+
+    return max(1, _env_int("HEALTHCHECK_BATCH_SIZE", DEFAULT_PROBE_HOST_BATCH))
+
+
+def probe_host_concurrency() -> int:
+    return max(1, _env_int("HEALTHCHECK_PROBE_CONCURRENCY", DEFAULT_PROBE_HOST_CONCURRENCY))
+
+
+def probe_per_host_limit() -> int:
+    """Probes in flight at once against proxies sharing one upstream server host."""
+
+    return max(1, _env_int("HEALTHCHECK_PER_HOST_LIMIT", DEFAULT_PROBE_PER_HOST_LIMIT))
+
+
+def probe_port_range() -> Tuple[int, int]:
+    """First and last local port probe listeners are leased from (``PROBE_PORT_RANGE=first-last``)."""
+
+    first, sep, last = os.getenv("PROBE_PORT_RANGE", "").partition("-")
+    try:
+        low, high = int(first), int(last)
+    except ValueError:
+        return DEFAULT_PROBE_PORT_RANGE
+    if not sep or not 0 < low <= high < 65536:
+        return DEFAULT_PROBE_PORT_RANGE
+    return low, high
+
+
+def probe_port_lock_path() -> Path:
+    """Lock file behind the port leases; every process probing on this host must share it."""
+
+    raw = os.getenv("PROBE_PORT_LOCK", "").strip()
+    return Path(raw) if raw else Path(tempfile.gettempdir()) / "proxypool-ports.lock"
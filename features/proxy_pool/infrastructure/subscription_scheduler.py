@@ -34,7 +34,6 @@ TEST_URL = 'http://www.msftconnecttest.com/connecttest.txt#expect=200'
 TEST_EXPECT_STATUSES = (204, 200)
 TEST_TIMEOUT = 8
 TEST_LISTEN_HOST = '127.0.0.1'
-TEST_START_PORT = 18081
 TEST_MAX_WORKERS = 20
 HEALTHCHECK_URL = 'http://www.msftconnecttest.com/connecttest.txt#expect=200'
 
@@ -60,7 +59,6 @@ def build_scheduler() -> tuple[SubscriptionScheduler, SchedulerConfig]:
         GliderForwardTester(
             glider_path=glider_path,
             listen_host=TEST_LISTEN_HOST,
-            start_port=TEST_START_PORT,
             timeout=TEST_TIMEOUT,
             max_workers=TEST_MAX_WORKERS,
             test_url=TEST_URL,
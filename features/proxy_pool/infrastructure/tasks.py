@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import os
+from dataclasses import asdict
 from pathlib import Path
 
 from celery import Celery
+from celery.signals import task_postrun
 
 from features.proxy_pool.application.orchestrator import ProxyPoolOrchestrator
 
 from ..application import services
+from . import metrics
 from .orchestrator_factory import build_proxy_pool_orchestrator
+from .redis_state import redis_client
 
 
 broker_url = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379/0")
@@ -25,9 +29,24 @@ app.conf.beat_schedule = {
         "task": "features.proxy_pool.infrastructure.tasks.health_check_all",
         "schedule": int(os.environ.get("HEALTHCHECK_INTERVAL", "1800")),
     },
+    "compact-probes": {
+        "task": "features.proxy_pool.infrastructure.tasks.compact_probe_history",
+        "schedule": int(os.environ.get("PROBE_COMPACTION_INTERVAL", "3600")),
+    },
+    "gc-proxies": {
+        "task": "features.proxy_pool.infrastructure.tasks.evict_dead_proxies",
+        "schedule": int(os.environ.get("PROXY_GC_INTERVAL", "86400")),
+    },
 }
 
 
+@task_postrun.connect
+def _push_metrics(**_kwargs) -> None:
+    metrics.push_to_redis(redis_client(), "worker")
+    # Between tasks too, or an idle worker's samples would expire after PUSH_TTL.
+    metrics.keep_pushing(redis_client, "worker")
+
+
 def _orchestrator() -> ProxyPoolOrchestrator:
     services.bootstrap()
     project_root = Path(os.getcwd())
@@ -49,3 +68,17 @@ def fetch_proxies() -> int:
 def health_check_all() -> int:
     orchestrator = _orchestrator()
     return orchestrator.perform_maintenance()
+
+
+@app.task(name="features.proxy_pool.infrastructure.tasks.compact_probe_history")
+def compact_probe_history() -> dict:
+    services.bootstrap()
+    # The pool change log is history housekeeping too and rides on the same schedule.
+    return {**asdict(services.compact_probe_history()), "pruned_changes": services.prune_pool_changes()}
+
+
+@app.task(name="features.proxy_pool.infrastructure.tasks.evict_dead_proxies")
+def evict_dead_proxies() -> dict:
+    services.bootstrap()
+    result = services.evict_dead_proxies()
+    return asdict(result)
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import csv
+import io
+import json
 import os
 import subprocess
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from ..application import services
+from ..domain.models import ProxyView
 from ..infrastructure.parser import _extract_host_port
 from ..infrastructure.orchestrator_factory import build_proxy_pool_orchestrator
+from ..infrastructure.pool_feed import PoolChangeBroadcaster
+from .listing_cache import ListingCache, accepts_gzip, etag_matches
 
 
 router = APIRouter()
+_listing_cache = ListingCache()
+_change_feed = PoolChangeBroadcaster()
 
 
 class ProxyOut(BaseModel):
@@ -32,27 +44,202 @@ def on_startup():
     services.bootstrap()
 
 
+def _out_dict(p: ProxyView) -> dict:
+    host, port = (p.host, p.port)
+    if (not host or port <= 0 or port > 65535) and p.uri:
+        host, port = _extract_host_port(p.uri)
+    return {
+        "uri": p.uri,
+        "scheme": p.scheme,
+        "host": host,
+        "port": port,
+        "label": p.label,
+        "status": p.status,
+        "score": p.score,
+        "avg_latency_ms": p.avg_latency_ms,
+    }
+
+
+def _to_out(p: ProxyView) -> ProxyOut:
+    return ProxyOut(**_out_dict(p))
+
+
+def encode_cursor(p: ProxyView) -> str:
+    raw = json.dumps([p.score, p.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, proxy_id = json.loads(raw)
+        return float(score), int(proxy_id)
+    except Exception as exc:
+        raise ValueError("malformed cursor") from exc
+
+
 @router.get("/proxies", response_model=List[ProxyOut])
-def list_proxies(min_score: float = Query(0.0, ge=0.0, le=100.0), limit: int = Query(200, ge=1, le=1000)):
-    items = services.list_proxies(min_score=min_score, limit=limit)
-    out: List[ProxyOut] = []
-    for p in items:
-        host, port = (p.host, p.port)
-        if (not host or port <= 0 or port > 65535) and p.uri:
-            host, port = _extract_host_port(p.uri)
-        out.append(
-            ProxyOut(
-                uri=p.uri,
-                scheme=p.scheme,
-                host=host,
-                port=port,
-                label=p.label,
-                status=p.status,
-                score=p.score,
-                avg_latency_ms=p.avg_latency_ms,
-            )
+def list_proxies(
+    min_score: float = Query(0.0, ge=0.0, le=100.0),
+    limit: int = Query(200, ge=1, le=1000),
+    strategy: Literal["score", "weighted"] = Query("score"),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+):
+    if strategy == "weighted":
+        items = services.list_proxies(min_score=min_score, limit=limit, strategy=strategy)
+        return [_to_out(p) for p in items]
+
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        items = services.list_proxies_after(min_score=min_score, limit=limit, cursor=after)
+        body = json.dumps([_out_dict(p) for p in items], ensure_ascii=False, separators=(",", ":"))
+        headers = {}
+        if len(items) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(items[-1])
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    snapshot = services.candidate_snapshot(min_score=min_score, limit=limit)
+    listing = _listing_cache.get(
+        (min_score, limit),
+        snapshot.generation,
+        lambda: [_out_dict(p) for p in snapshot.candidates],
+    )
+    use_gzip = accepts_gzip(accept_encoding)
+    etag = listing.gzip_etag if use_gzip else listing.etag
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+        "X-Pool-Generation": str(snapshot.generation),
+    }
+    if len(snapshot.candidates) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(snapshot.candidates[-1])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=listing.gzipped(), media_type="application/json", headers=headers)
+    return Response(content=listing.body, media_type="application/json", headers=headers)
+
+
+EXPORT_COLUMNS = ("uri", "scheme", "host", "port", "label", "status", "score", "avg_latency_ms")
+
+
+def _export_ndjson(min_score: float, batch_size: int) -> Iterator[bytes]:
+    buf: List[str] = []
+    for n, p in enumerate(services.iter_proxies(min_score=min_score, batch_size=batch_size)):
+        buf.append(json.dumps(_out_dict(p), ensure_ascii=False, separators=(",", ":")))
+        # The first row goes out alone, so the first byte does not wait for a whole batch.
+        if n == 0 or len(buf) >= batch_size:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def _export_csv(min_score: float, batch_size: int) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def drain() -> bytes:
+        chunk = out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate(0)
+        return chunk
+
+    writer.writerow(EXPORT_COLUMNS)
+    # The header goes out before the first query, so the first byte does not wait for a batch.
+    yield drain()
+    rows = 0
+    for p in services.iter_proxies(min_score=min_score, batch_size=batch_size):
+        item = _out_dict(p)
+        writer.writerow([item[c] for c in EXPORT_COLUMNS])
+        rows += 1
+        if rows % batch_size == 0:
+            yield drain()
+    if out.tell():
+        yield drain()
+
+
+@router.get("/proxies/export")
+def export_proxies(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    min_score: float = Query(0.0, ge=0.0, le=100.0),
+    batch_size: int = Query(500, ge=1, le=5000),
+):
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(min_score, batch_size),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="proxies.csv"'},
         )
-    return out
+    return StreamingResponse(_export_ndjson(min_score, batch_size), media_type="application/x-ndjson")
+
+
+SSE_HEARTBEAT_SECONDS = 15.0
+
+
+async def _change_events(request: Request) -> AsyncIterator[str]:
+    queue = _change_feed.subscribe()
+    try:
+        snapshot = await run_in_threadpool(services.candidate_snapshot)
+        yield f"event: hello\ndata: {json.dumps({'generation': snapshot.generation})}\n\n"
+        while not await request.is_disconnected():
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if payload is None:
+                # Messages may have been missed; the client should re-read /api/proxies.
+                yield "event: resync\ndata: {}\n\n"
+                if not _change_feed.is_subscribed(queue):
+                    return
+                continue
+            yield f"event: diff\ndata: {payload}\n\n"
+    finally:
+        _change_feed.unsubscribe(queue)
+
+
+@router.get("/proxies/stream")
+async def stream_pool_changes(request: Request):
+    return StreamingResponse(
+        _change_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class PoolDeltaOut(BaseModel):
+    since: int
+    generation: int
+    added: List[ProxyOut]
+    removed: List[str]
+    rescored: List[ProxyOut]
+
+
+@router.get("/proxies/changes", response_model=PoolDeltaOut)
+def list_pool_changes(
+    since: int = Query(..., ge=0, description="Generation already mirrored, e.g. a previous X-Pool-Generation"),
+):
+    delta = services.pool_changes_since(since)
+    if delta is None:
+        raise HTTPException(status_code=410, detail="Change history no longer covers this generation; re-read /api/proxies")
+    return PoolDeltaOut(
+        since=delta.since,
+        generation=delta.generation,
+        added=[_to_out(p) for p in delta.added],
+        removed=delta.removed,
+        rescored=[_to_out(p) for p in delta.rescored],
+    )
+
+
+RotateStrategy = Literal["hash", "consistent", "weighted"]
 
 
 class RotateOut(BaseModel):
@@ -62,26 +249,54 @@ class RotateOut(BaseModel):
 
 
 @router.get("/proxy/rotate", response_model=RotateOut)
-def get_rotated_proxy(token: str, rotate_every: int = Query(5, ge=1), min_score: float = Query(20.0, ge=0.0, le=100.0)):
-    p = services.get_rotated_proxy(token=token, rotate_every=rotate_every, min_score=min_score)
+def get_rotated_proxy(
+    token: str,
+    rotate_every: int = Query(5, ge=1),
+    min_score: float = Query(20.0, ge=0.0, le=100.0),
+    strategy: RotateStrategy = Query("hash"),
+):
+    p = services.get_rotated_proxy(token=token, rotate_every=rotate_every, min_score=min_score, strategy=strategy)
     if not p:
         raise HTTPException(status_code=503, detail="No proxies available")
-    host, port = (p.host, p.port)
-    if (not host or port <= 0 or port > 65535) and p.uri:
-        host, port = _extract_host_port(p.uri)
-    return RotateOut(
-        token=token,
-        rotate_every=rotate_every,
-        proxy=ProxyOut(
-            uri=p.uri,
-            scheme=p.scheme,
-            host=host,
-            port=port,
-            label=p.label,
-            status=p.status,
-            score=p.score,
-            avg_latency_ms=p.avg_latency_ms,
-        ),
+    return RotateOut(token=token, rotate_every=rotate_every, proxy=_to_out(p))
+
+
+MAX_BATCH_PICKS = 1000
+
+
+class RotateEntryIn(BaseModel):
+    token: str
+    rotate_every: int = Field(5, ge=1)
+    count: int = Field(1, ge=1, le=MAX_BATCH_PICKS)
+
+
+class RotateBatchIn(BaseModel):
+    entries: List[RotateEntryIn] = Field(default_factory=list)
+    token: Optional[str] = None
+    rotate_every: int = Field(5, ge=1)
+    count: int = Field(1, ge=1, le=MAX_BATCH_PICKS)
+    min_score: float = Field(20.0, ge=0.0, le=100.0)
+    strategy: RotateStrategy = "hash"
+
+
+class RotateBatchOut(BaseModel):
+    items: List[RotateOut]
+
+
+@router.post("/proxy/rotate/batch", response_model=RotateBatchOut)
+def get_rotated_proxies(body: RotateBatchIn):
+    entries = [(e.token, e.rotate_every, e.count) for e in body.entries]
+    if body.token:
+        entries.append((body.token, body.rotate_every, body.count))
+    if not entries:
+        raise HTTPException(status_code=422, detail="Provide entries or token")
+    if sum(count for _, _, count in entries) > MAX_BATCH_PICKS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_PICKS} picks per batch")
+    picks = services.get_rotated_proxies(entries, min_score=body.min_score, strategy=body.strategy)
+    if any(p is None for _, _, p in picks):
+        raise HTTPException(status_code=503, detail="No proxies available")
+    return RotateBatchOut(
+        items=[RotateOut(token=token, rotate_every=every, proxy=_to_out(p)) for token, every, p in picks]
     )
 
 
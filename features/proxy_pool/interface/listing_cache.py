@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:  # orjson is optional; it is several times faster for large listings.
+    import orjson
+
+    def _dumps(payload: List[Dict[str, Any]]) -> bytes:
+        return orjson.dumps(payload)
+
+except ImportError:  # pragma: no cover - depends on the deployment image
+
+    def _dumps(payload: List[Dict[str, Any]]) -> bytes:
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+@dataclass
+class RenderedListing:
+    generation: int
+    etag: str
+    body: bytes
+    _gzipped: Optional[bytes] = None
+
+    @property
+    def gzip_etag(self) -> str:
+        # A strong ETag identifies exact bytes, so the compressed variant needs its own tag.
+        return self.etag[:-1] + '-gz"'
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class ListingCache:
+    """Serialized ``/api/proxies`` bodies, reused for as long as the pool generation holds."""
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[float, int], RenderedListing] = {}
+
+    def get(
+        self,
+        key: Tuple[float, int],
+        generation: int,
+        render: Callable[[], List[Dict[str, Any]]],
+    ) -> RenderedListing:
+        entry = self._entries.get(key)
+        if entry is not None and entry.generation == generation:
+            return entry
+        body = _dumps(render())
+        min_score, limit = key
+        entry = RenderedListing(
+            generation=generation,
+            etag=f'"{generation}-{min_score:g}-{limit}"',
+            body=body,
+        )
+        with self._lock:
+            if len(self._entries) >= self._max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v.generation == generation}
+            self._entries[key] = entry
+        return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether ``Accept-Encoding`` allows gzip: listed (or matched by ``*``) with a q-value above 0."""
+
+    if not accept_encoding:
+        return False
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.lower()] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0.0
@@ -6,12 +6,10 @@
 import argparse
 import itertools
 import os
-import random
 import re
 import shutil
 import subprocess
 import sys
-import time
 
 import crawl
 import executable
@@ -274,7 +272,8 @@ def aggregate(args: argparse.Namespace) -> None:
         )
         logger.info(f"clash start success, begin check proxies, num: {len(proxies)}")
 
-        time.sleep(random.randint(3, 6))
+        if not utils.wait_listening(clash.EXTERNAL_CONTROLLER, timeout=30, process=process):
+            logger.warning(f"clash external controller {clash.EXTERNAL_CONTROLLER} is not ready, check may fail")
         params = [
             [p, clash.EXTERNAL_CONTROLLER, 5000, args.url, args.delay, False] for p in proxies if isinstance(p, dict)
         ]
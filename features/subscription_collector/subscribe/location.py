@@ -10,7 +10,6 @@ import random
 import re
 import socket
 import subprocess
-import sys
 import time
 import urllib
 from collections import defaultdict
@@ -459,186 +458,8 @@ def locate_by_geoip(proxy: dict, reader: database.Reader) -> dict:
     return proxy
 
 
-# Cache for checked port statuses
-_PORT_STATUS_CACHE = {}
-_AVAILABLE_PORTS = set()
-
-
-def get_listening_ports() -> set:
-    """Get the set of listening ports in the system, cross-platform compatible"""
-    listening_ports = set()
-
-    try:
-        # Windows system
-        if os.name == "nt":
-            try:
-                # Use 'cp437' encoding to handle Windows command line output
-                output = subprocess.check_output("netstat -an", shell=True).decode("cp437", errors="replace")
-                for line in output.split("\n"):
-                    if "LISTENING" in line:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            addr_port = parts[1]
-                            if ":" in addr_port:
-                                try:
-                                    port = int(addr_port.split(":")[-1])
-                                    listening_ports.add(port)
-                                except ValueError:
-                                    pass
-            except Exception as e:
-                logger.warning(f"Windows netstat command failed: {str(e)}")
-                return listening_ports
-
-        # macOS system
-        elif sys.platform == "darwin":
-            try:
-                output = subprocess.check_output("lsof -i -P -n | grep LISTEN", shell=True).decode(
-                    "utf-8", errors="replace"
-                )
-                for line in output.split("\n"):
-                    if ":" in line:
-                        try:
-                            port_part = line.split(":")[-1].split(" ")[0]
-                            port = int(port_part)
-                            listening_ports.add(port)
-                        except (ValueError, IndexError):
-                            pass
-            except Exception as e:
-                logger.warning(f"macOS lsof command failed: {str(e)}")
-                return listening_ports
-
-        # Linux and other systems
-        else:
-            # Try using ss command (newer Linux systems)
-            try:
-                output = subprocess.check_output("ss -tuln", shell=True).decode("utf-8", errors="replace")
-                for line in output.split("\n"):
-                    if "LISTEN" in line:
-                        parts = line.split()
-                        for part in parts:
-                            if ":" in part:
-                                try:
-                                    port = int(part.split(":")[-1])
-                                    listening_ports.add(port)
-                                except ValueError:
-                                    pass
-            except Exception as e:
-                logger.warning(f"Linux ss command failed, trying netstat: {str(e)}")
-                # Fall back to netstat command (older Linux systems)
-                try:
-                    output = subprocess.check_output("netstat -tuln", shell=True).decode("utf-8", errors="replace")
-                    for line in output.split("\n"):
-                        if "LISTEN" in line:
-                            parts = line.split()
-                            for part in parts:
-                                if ":" in part:
-                                    try:
-                                        port = int(part.split(":")[-1])
-                                        listening_ports.add(port)
-                                    except ValueError:
-                                        pass
-                except Exception as e:
-                    logger.warning(f"Linux netstat command also failed: {str(e)}")
-                    return listening_ports
-    except Exception as e:
-        logger.warning(f"Failed to get listening ports: {str(e)}")
-
-    return listening_ports
-
-
-def scan_ports_batch(start_port: int, count: int = 100) -> dict:
-    """Batch scan port statuses, return a dictionary of port statuses"""
-    global _PORT_STATUS_CACHE, _AVAILABLE_PORTS
-
-    # Create a list of ports to scan (excluding ports with known status)
-    ports_to_scan = [p for p in range(start_port, start_port + count) if p not in _PORT_STATUS_CACHE]
-
-    if not ports_to_scan:
-        # If all ports are already cached, return cached results directly
-        return {p: _PORT_STATUS_CACHE.get(p, True) for p in range(start_port, start_port + count)}
-
-    # Use a more efficient way to check ports in batch
-    results = {}
-
-    try:
-        # Get the ports that are currently listening in the system
-        listening_ports = get_listening_ports()
-
-        # Update results
-        for port in ports_to_scan:
-            in_use = port in listening_ports
-            results[port] = in_use
-            _PORT_STATUS_CACHE[port] = in_use
-            if not in_use:
-                _AVAILABLE_PORTS.add(port)
-    except Exception as e:
-        logger.warning(f"Batch port scanning failed, falling back to individual port checks: {str(e)}")
-        # If batch checking fails, fall back to individual port checks
-        for port in ports_to_scan:
-            in_use = check_single_port(port)
-            results[port] = in_use
-            _PORT_STATUS_CACHE[port] = in_use
-            if not in_use:
-                _AVAILABLE_PORTS.add(port)
-
-    # Merge cached and newly scanned results
-    return {
-        **{
-            p: _PORT_STATUS_CACHE.get(p, True) for p in range(start_port, start_port + count) if p in _PORT_STATUS_CACHE
-        },
-        **results,
-    }
-
-
-def check_single_port(port: int) -> bool:
-    """Helper function for checking a single port, checks if the port is listening"""
-    try:
-        # Use socket to check TCP port
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(0.2)
-        result = sock.connect_ex(("127.0.0.1", port))
-        sock.close()
-        if result == 0:
-            return True
-
-        # Also check IPv6
-        try:
-            sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
-            sock.settimeout(0.2)
-            result = sock.connect_ex(("::1", port))
-            sock.close()
-            return result == 0
-        except:
-            pass
-
-        return False
-    except:
-        # Assume port is not in use when an error occurs
-        return False
-
-
-def is_port_in_use(port: int) -> bool:
-    """Check if a port is in use (using cache)"""
-    global _PORT_STATUS_CACHE, _AVAILABLE_PORTS
-
-    # If port is known to be available, return directly
-    if port in _AVAILABLE_PORTS:
-        return False
-
-    # If port status is already cached, return directly
-    if port in _PORT_STATUS_CACHE:
-        return _PORT_STATUS_CACHE[port]
-
-    # Otherwise check the port and cache the result
-    in_use = check_single_port(port)
-    _PORT_STATUS_CACHE[port] = in_use
-    if not in_use:
-        _AVAILABLE_PORTS.add(port)
-    return in_use
-
-
-def generate_mihomo_config(proxies: list[dict]) -> tuple[dict, dict]:
-    """Generate mihomo configuration for the given proxies"""
+def generate_mihomo_config(proxies: list[dict], ports: list[int]) -> tuple[dict, dict]:
+    """Generate mihomo configuration for the given proxies, one listener on a leased port (see utils.lease_ports) each"""
     # Base configuration
     config = {
         "mixed-port": 7890,
@@ -663,40 +484,13 @@ def generate_mihomo_config(proxies: list[dict]) -> tuple[dict, dict]:
     if not proxies:
         return config, records
 
-    # Pre-scan ports in batch to improve efficiency
-    start_port = 32001
-
-    # Scan enough ports to ensure there are sufficient available ports
-    port_count = len(proxies) * 2
-    port_status = scan_ports_batch(start_port, port_count)
-
-    # Find all available ports
-    available_ports = [p for p, in_use in port_status.items() if not in_use]
-
-    # If available ports are insufficient, scan more ports
-    if len(available_ports) < len(proxies):
-        additional_ports = scan_ports_batch(start_port + port_count, port_count * 2)
-        available_ports.extend([p for p, in_use in additional_ports.items() if not in_use])
-
-    # Assign an available port to each proxy
+    # Assign a leased port to each proxy
     for index, proxy in enumerate(proxies):
-        if index < len(available_ports):
-            port = available_ports[index]
-        else:
-            # If available ports are insufficient, use traditional method to find available ports
-            port = start_port + port_count + index
-            max_attempts = 1000
-            attempts = 0
-
-            while is_port_in_use(port) and attempts < max_attempts:
-                port += 1
-                attempts += 1
+        if index >= len(ports):
+            logger.warning(f"No free port left for proxy {proxy['name']}, skip it")
+            continue
 
-            if attempts >= max_attempts:
-                logger.warning(
-                    f"Could not find an available port for proxy {proxy['name']} after {max_attempts} attempts"
-                )
-                continue
+        port = ports[index]
 
         listener = {
             "name": f"http-{index}",
@@ -986,8 +780,27 @@ def batch_query(
     nodes = rename(proxies, digits, False)
 
     logger.info(f"Generate clash listeners configuration for {len(nodes)} proxies")
+    # Lease listener ports, shared with every other prober on this host
+    ports = utils.lease_ports(len(nodes))
+    try:
+        return _run_batch_query(nodes, ports, func, num_threads, show_progress, description, reader, api_key)
+    finally:
+        # mihomo has exited by now, so its listener ports can go to the next prober
+        utils.release_ports(ports)
+
+
+def _run_batch_query(
+    nodes: list[dict],
+    ports: list[int],
+    func: callable,
+    num_threads: int,
+    show_progress: bool,
+    description: str,
+    reader: database.Reader,
+    api_key: str,
+) -> list[ProxyQueryResult]:
     # Generate mihomo configuration
-    config, records = generate_mihomo_config(nodes)
+    config, records = generate_mihomo_config(nodes, ports)
 
     # Save the configuration to clash/config.yaml in the project directory
     workspace = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "clash")
@@ -1017,9 +830,10 @@ def batch_query(
             stderr=subprocess.PIPE,
         )
 
-        # Wait longer to ensure mihomo is fully started
+        # Start checking as soon as every listener accepts connections
         logger.info("Waiting for mihomo to start...")
-        time.sleep(8)
+        if not utils.wait_listening("127.0.0.1", records.values(), timeout=30, process=process):
+            logger.warning("Not all mihomo listeners are ready, some checks may fail")
 
         # Create proxy info mapping for task generation
         mappings = {proxy["name"]: proxy for proxy in nodes}
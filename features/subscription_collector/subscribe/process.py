@@ -9,7 +9,6 @@ import copy
 import itertools
 import json
 import os
-import random
 import re
 import subprocess
 import sys
@@ -594,7 +593,8 @@ def aggregate(args: argparse.Namespace) -> None:
                 )
 
                 logger.info(f"clash start success, begin check proxies, group: {k}\tcount: {len(checks)}")
-                time.sleep(random.randint(5, 8))
+                if not utils.wait_listening(clash.EXTERNAL_CONTROLLER, timeout=30, process=process):
+                    logger.warning(f"clash external controller is not ready, group: {k}")
 
                 params = [
                     [p, clash.EXTERNAL_CONTROLLER, args.timeout, args.url, process_config.delay, False]
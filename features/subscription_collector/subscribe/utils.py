@@ -15,6 +15,8 @@ import ssl
 import string
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import traceback
 import typing
@@ -30,6 +32,11 @@ from logger import logger
 from tqdm import tqdm
 from urlvalidator import isurl
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 CTX = ssl.create_default_context()
 CTX.check_hostname = False
 CTX.verify_mode = ssl.CERT_NONE
@@ -224,6 +231,112 @@ def chmod(binfile: str) -> None:
         sys.exit(0)
 
 
+def wait_listening(
+    address: str, ports: typing.Iterable[int] = None, timeout: float = 30, process: subprocess.Popen = None
+) -> bool:
+    """poll until every port accepts connections instead of sleeping a fixed time after starting a client
+
+    address is either "host:port" or a host combined with ports; returns False if the process exits or timeout
+    """
+    if ports is None:
+        address, port = address.rsplit(":", maxsplit=1)
+        ports = [int(port)]
+
+    pending, interval = list(ports), 0.01
+    deadline = time.time() + timeout
+    while pending:
+        try:
+            with socket.create_connection((address, pending[-1]), timeout=0.5):
+                pending.pop()
+            continue
+        except OSError:
+            pass
+
+        if (process is not None and process.poll() is not None) or time.time() >= deadline:
+            return False
+
+        time.sleep(interval)
+        interval = min(interval * 2, 0.5)
+
+    return True
+
+
+# same lock file and layout as the proxy pool's port allocator (the byte at offset N guards port N), so both never
+# hand out one port twice even when configured with different ranges
+PORT_LOCK_FILE = os.environ.get("PROBE_PORT_LOCK", "").strip() or os.path.join(
+    tempfile.gettempdir(), "proxypool-ports.lock"
+)
+_PORT_LOCK_FD = None
+_LEASED_PORTS = set()
+_LEASE_LOCK = threading.Lock()
+
+
+def port_range() -> tuple[int, int]:
+    first, _, last = os.environ.get("PROBE_PORT_RANGE", "").partition("-")
+    try:
+        low, high = int(first), int(last)
+    except ValueError:
+        return 18081, 28080
+
+    return (low, high) if 0 < low <= high < 65536 else (18081, 28080)
+
+
+def lease_ports(count: int, host: str = "127.0.0.1") -> list[int]:
+    """lease up to count local ports that no other process is probing on and that can be bound right now
+
+    every port is one byte of PORT_LOCK_FILE held with a record lock, the kernel drops it if the process dies;
+    call release_ports once the listeners are closed
+    """
+    global _PORT_LOCK_FD
+
+    low, high = port_range()
+    ports = []
+    with _LEASE_LOCK:
+        if fcntl is not None and _PORT_LOCK_FD is None:
+            # never closed, closing any descriptor of the file drops all record locks of this process
+            _PORT_LOCK_FD = os.open(PORT_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o666)
+
+        for port in range(low, high + 1):
+            if len(ports) >= count:
+                break
+            if port in _LEASED_PORTS:
+                continue
+
+            if _PORT_LOCK_FD is not None:
+                try:
+                    fcntl.lockf(_PORT_LOCK_FD, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, port)
+                except OSError:
+                    continue
+
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                if os.name != "nt":
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.bind((host, port))
+                    usable = True
+                except OSError:
+                    usable = False
+
+            if usable:
+                _LEASED_PORTS.add(port)
+                ports.append(port)
+            elif _PORT_LOCK_FD is not None:
+                fcntl.lockf(_PORT_LOCK_FD, fcntl.LOCK_UN, 1, port)
+
+    return ports
+
+
+def release_ports(ports: typing.Iterable[int]) -> None:
+    with _LEASE_LOCK:
+        for port in ports:
+            if port not in _LEASED_PORTS:
+                continue
+
+            _LEASED_PORTS.discard(port)
+            if _PORT_LOCK_FD is not None:
+                fcntl.lockf(_PORT_LOCK_FD, fcntl.LOCK_UN, 1, port)
+
+
 def encoding_url(url: str) -> str:
     if not url:
         return ""
@@ -0,0 +1,41 @@
+"""Measure the per-call cost that metrics add to the rotate path.
+
+Usage: python scripts/bench_metrics_overhead.py [iterations]
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from features.proxy_pool.infrastructure.metrics import ROTATE_SECONDS  # noqa: E402
+
+
+def _bare() -> None:
+    pass
+
+
+def _timed() -> None:
+    with ROTATE_SECONDS.time(strategy="bench"):
+        pass
+
+
+def _run(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    bare = _run(_bare, iterations)
+    timed = _run(_timed, iterations)
+    print(f"baseline call        {bare * 1e9:8.0f} ns")
+    print(f"with histogram.time  {timed * 1e9:8.0f} ns  (+{(timed - bare) * 1e6:.2f} us per rotate)")
+
+
+if __name__ == "__main__":
+    main()
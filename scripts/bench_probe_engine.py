@@ -0,0 +1,76 @@
+"""Probes/sec of the threaded ``requests`` probe path versus the asyncio probe engine.
+
+A local stand-in plays the proxy listeners: it accepts connections on ``listeners`` ports and
+answers every request with ``204`` after ``delay`` seconds, standing in for the upstream round
+trip. No network access is needed.
+
+Usage: python scripts/bench_probe_engine.py [probes] [delay] [listeners]   (default: 2000 0.1 200)
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from features.proxy_pool.infrastructure.async_probe import AsyncProbeEngine, ProbeTarget  # noqa: E402
+from features.proxy_pool.infrastructure.healthcheck import probe_listener  # noqa: E402
+
+
+def _start_stand_in(listeners: int, delay: float) -> List[int]:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def handle(reader, writer) -> None:
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(delay)
+            writer.write(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start() -> List[int]:
+        servers = [await asyncio.start_server(handle, "127.0.0.1", 0, backlog=4096) for _ in range(listeners)]
+        return [server.sockets[0].getsockname()[1] for server in servers]
+
+    return asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+
+def _threaded(ports: List[int], probes: int, workers: int) -> int:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(ok for ok, _ in executor.map(probe_listener, (ports[n % len(ports)] for n in range(probes))))
+
+
+def _engine(ports: List[int], probes: int, concurrency: int) -> int:
+    targets = [ProbeTarget(f"ss://bench-{n}", ports[n % len(ports)], f"upstream-{n % 50}") for n in range(probes)]
+    engine = AsyncProbeEngine(concurrency=concurrency, per_host=concurrency)
+    return sum(ok for _, ok, _ in engine.run(targets))
+
+
+def main() -> None:
+    probes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    listeners = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    ports = _start_stand_in(listeners, delay)
+    runs = [
+        ("threads x10 (HEALTHCHECK_WORKERS)", lambda: _threaded(ports, probes, 10)),
+        ("threads x64", lambda: _threaded(ports, probes, 64)),
+        ("asyncio engine x1000", lambda: _engine(ports, probes, 1000)),
+    ]
+    baseline = None
+    for name, fn in runs:
+        started = time.perf_counter()
+        ok = fn()
+        rate = probes / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"{name:>36}  {probes} probes  {ok} ok  {rate:9.0f} probes/s (x{rate / baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare the ORM listing path with the Core/tuple-record and mmap-snapshot read paths.
+
+Reports per-call latency (best of N) plus the peak and retained memory of one listing, measured
+with tracemalloc, for ``ProxyRepository.list_records`` and ``MappedPoolSnapshot.list_records``
+against the previous ORM + dataclass path, all on a scratch SQLite database.
+
+Usage: python scripts/bench_read_path.py [rows] [repeats]   (default: 10000 20)
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from features.proxy_pool.domain.models import Proxy  # noqa: E402
+from features.proxy_pool.infrastructure.db import Base, ProxyORM  # noqa: E402
+from features.proxy_pool.infrastructure.pool_snapshot import MappedPoolSnapshot, write_snapshot  # noqa: E402
+from features.proxy_pool.infrastructure.repository import ProxyRepository  # noqa: E402
+
+
+def _proxies(count: int) -> List[Proxy]:
+    return [
+        Proxy(
+            id=None,
+            uri=f"ss://aes-128-gcm:pw@10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}:8388",
+            scheme="ss",
+            host=f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+            port=8388,
+            label=f"node-{n}",
+        )
+        for n in range(count)
+    ]
+
+
+def _orm_list(session, limit: int) -> List[Proxy]:
+    """The listing as it was: ORM entities copied field by field into Proxy dataclasses."""
+    rows = session.execute(
+        select(ProxyORM).order_by(ProxyORM.score.desc(), ProxyORM.id.asc()).limit(limit)
+    ).scalars().all()
+    out = [
+        Proxy(
+            id=o.id, uri=o.uri, scheme=o.scheme, host=o.host, port=o.port, label=o.label,
+            status=o.status, score=o.score, success_count=o.success_count, fail_count=o.fail_count,
+            avg_latency_ms=o.avg_latency_ms, last_checked=o.last_checked, last_ok=o.last_ok,
+            created_at=o.created_at, updated_at=o.updated_at,
+        )
+        for o in rows
+    ]
+    session.rollback()  # end the read transaction like a closed request session would
+    session.expunge_all()
+    return out
+
+
+def _best_latency(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _memory(fn: Callable[[], object]) -> Tuple[int, int]:
+    """``(peak, retained)`` bytes allocated while producing and then holding one listing."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, current
+
+
+def main() -> None:
+    import warnings
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'read.db'}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        repo = ProxyRepository(session=session)
+        repo.upsert_many(_proxies(rows))
+        snapshot_path = Path(tmp) / "pool.snapshot"
+        write_snapshot(snapshot_path, repo.generation(), repo.list_records(limit=rows))
+        snapshot = MappedPoolSnapshot(snapshot_path)
+        paths = {
+            "orm+dataclass": lambda: _orm_list(session, rows),
+            "core+record": lambda: repo.list_records(limit=rows),
+            "mmap snapshot": lambda: snapshot.list_records(limit=rows),
+        }
+        results = {}
+        for name, fn in paths.items():
+            fn()  # warm statement caches
+            results[name] = (_best_latency(fn, repeats), *_memory(fn))
+        session.close()
+        engine.dispose()
+    base_latency, base_peak, base_retained = results["orm+dataclass"]
+    for name, (latency, peak, retained) in results.items():
+        print(
+            f"{name:>14}  {rows} rows  {latency * 1000:8.1f} ms (x{base_latency / latency:.2f})"
+            f"  peak {peak / rows:6.0f} B/row (x{base_peak / peak:.2f})"
+            f"  retained {retained / rows:6.0f} B/row (x{base_retained / retained:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
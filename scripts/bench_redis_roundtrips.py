@@ -0,0 +1,63 @@
+"""Count Redis round trips spent on rotation counters.
+
+Usage: REDIS_URL=redis://localhost:6379/0 python scripts/bench_redis_roundtrips.py [requests] [batch]
+"""
+from __future__ import annotations
+
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from features.proxy_pool.infrastructure import redis_state  # noqa: E402
+
+
+_round_trips = 0
+_send_packed_command = redis.connection.Connection.send_packed_command
+
+
+def _counting_send(self, command, check_health=True):
+    global _round_trips
+    _round_trips += 1
+    return _send_packed_command(self, command, check_health)
+
+
+def _legacy_incr(token: str, ttl: int = 86400) -> int:
+    r = redis.from_url(redis_state.redis_url())
+    key = redis_state.TOKEN_COUNT_KEY.format(token=token)
+    cnt = r.incr(key)
+    if cnt == 1:
+        r.expire(key, ttl)
+    return int(cnt)
+
+
+def _measure(label: str, calls: int, fn) -> None:
+    global _round_trips
+    _round_trips = 0
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {_round_trips / calls:6.2f} round trips/request  {calls / elapsed:10.0f} requests/s")
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    redis.connection.Connection.send_packed_command = _counting_send
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    # Warm the pool and the server-side script cache so steady-state numbers are reported.
+    redis_state.incr_token_count(f"{prefix}-warmup")
+
+    _measure("legacy INCR+EXPIRE", calls, lambda: _legacy_incr(f"{prefix}-legacy-{uuid.uuid4().hex}"))
+    _measure("pooled script", calls, lambda: redis_state.incr_token_count(f"{prefix}-{uuid.uuid4().hex}"))
+    tokens = [(f"{prefix}-batch-{i}", 1) for i in range(batch)]
+    _measure(f"pipelined batch of {batch}", max(1, calls // batch), lambda: redis_state.incr_token_counts(tokens))
+
+
+if __name__ == "__main__":
+    main()
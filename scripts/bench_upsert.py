@@ -0,0 +1,85 @@
+"""Compare per-row and chunked upsert throughput on a scratch SQLite database.
+
+Usage: python scripts/bench_upsert.py [sizes...]   (default: 1000 10000 100000)
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from features.proxy_pool.domain.models import Proxy  # noqa: E402
+from features.proxy_pool.infrastructure.db import Base, ProxyORM  # noqa: E402
+from features.proxy_pool.infrastructure.repository import ProxyRepository  # noqa: E402
+
+
+def _proxies(count: int, salt: str = "") -> list[Proxy]:
+    return [
+        Proxy(
+            id=None,
+            uri=f"ss://aes-128-gcm:pw{salt}@10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}:8388",
+            scheme="ss",
+            host=f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+            port=8388,
+            label=f"node-{n}",
+        )
+        for n in range(count)
+    ]
+
+
+def _legacy_upsert(session, proxies: list[Proxy]) -> int:
+    for p in proxies:
+        stmt = (
+            insert(ProxyORM)
+            .values(uri=p.uri, scheme=p.scheme, host=p.host, port=p.port, label=p.label)
+            .on_conflict_do_update(
+                index_elements=[ProxyORM.uri],
+                set_={"scheme": p.scheme, "host": p.host, "port": p.port, "label": p.label,
+                      "updated_at": datetime.utcnow()},
+            )
+        )
+        session.execute(stmt)
+    session.commit()
+    return len(proxies)
+
+
+def _run(size: int, workdir: Path) -> None:
+    results = []
+    for name in ("per-row", "chunked"):
+        engine = create_engine(f"sqlite:///{workdir / f'{name}-{size}.db'}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        proxies = _proxies(size)
+        started = time.perf_counter()
+        if name == "per-row":
+            _legacy_upsert(session, proxies)
+        else:
+            ProxyRepository(session=session).upsert_many(proxies)
+        elapsed = time.perf_counter() - started
+        session.close()
+        engine.dispose()
+        results.append((name, size / elapsed))
+    (_, before), (_, after) = results
+    print(f"{size:>8} rows  per-row {before:10.0f} rows/s  chunked {after:10.0f} rows/s  x{after / before:.1f}")
+
+
+def main() -> None:
+    import warnings
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            _run(size, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from features.proxy_pool.infrastructure.db import Base
+from features.proxy_pool.infrastructure.repository import ProxyRepository
+
+
+@pytest.fixture
+def store_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    yield lambda: ProxyRepository(session=factory())
+    engine.dispose()
@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from features.proxy_pool.application import services
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure.candidate_cache import CandidateCache
+from features.proxy_pool.interface import api
+
+
+def _proxy(n: int) -> Proxy:
+    return Proxy(id=None, uri=f"ss://aes-128-gcm:pw@10.1.0.{n}:8388", scheme="ss", host=f"10.1.0.{n}", port=8388)
+
+
+@pytest.fixture
+def client(monkeypatch, store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(5)])
+    monkeypatch.setattr(services, "_store_class", store_factory)
+    monkeypatch.setattr(services, "_candidate_cache", CandidateCache(store_factory, check_interval=0.0))
+    return TestClient(app_module.app)
+
+
+def test_list_proxies_etag_round_trip(client, store_factory):
+    first = client.get("/api/proxies", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert len(first.json()) == 5
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/proxies", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(9)])
+    changed = client.get("/api/proxies", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 6
+
+
+def test_list_proxies_gzip_variant(client):
+    resp = client.get("/api/proxies", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["etag"].endswith('-gz"')
+    assert len(resp.json()) == 5
+
+
+@pytest.mark.parametrize("limit", [3, 5, 50])
+def test_weighted_listing_returns_a_full_page(client, limit):
+    resp = client.get(f"/api/proxies?strategy=weighted&limit={limit}", headers={"Accept-Encoding": "identity"})
+    uris = [p["uri"] for p in resp.json()]
+    assert len(uris) == len(set(uris)) == min(limit, 5)
+
+
+@pytest.mark.parametrize("header", ["gzip;q=0", "identity", "br, *;q=0", "GZIP;q=0.0, deflate"])
+def test_list_proxies_honours_refused_gzip(client, header):
+    resp = client.get("/api/proxies", headers={"Accept-Encoding": header})
+    assert "content-encoding" not in resp.headers
+    assert not resp.headers["etag"].endswith('-gz"')
+    assert len(resp.json()) == 5
+
+
+def test_export_sends_first_bytes_before_a_full_batch(client):
+    csv_chunks = api._export_csv(0.0, batch_size=500)
+    assert next(csv_chunks).decode().startswith("uri,scheme,host,port")
+    ndjson_chunks = list(api._export_ndjson(0.0, batch_size=500))
+    assert [chunk.count(b"\n") for chunk in ndjson_chunks] == [1, 4]
+
+
+def test_export_streams_every_row(client):
+    ndjson = client.get("/api/proxies/export?format=ndjson&batch_size=2")
+    assert len(ndjson.text.splitlines()) == 5
+    csv_resp = client.get("/api/proxies/export?format=csv&batch_size=2")
+    lines = csv_resp.text.strip().splitlines()
+    assert lines[0].startswith("uri,scheme,host,port")
+    assert len(lines) == 6
+
+
+def test_cursor_pagination_walks_whole_pool(client):
+    seen = []
+    resp = client.get("/api/proxies?limit=2", headers={"Accept-Encoding": "identity"})
+    seen.extend(p["uri"] for p in resp.json())
+    while "x-next-cursor" in resp.headers:
+        resp = client.get(f"/api/proxies?limit=2&cursor={resp.headers['x-next-cursor']}")
+        seen.extend(p["uri"] for p in resp.json())
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_changes_endpoint_returns_delta_then_410_once_pruned(client, store_factory):
+    listing = client.get("/api/proxies", headers={"Accept-Encoding": "identity"})
+    since = int(listing.headers["x-pool-generation"])
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(7)])
+
+    delta = client.get(f"/api/proxies/changes?since={since}").json()
+    assert [p["uri"] for p in delta["added"]] == [_proxy(7).uri]
+    assert delta["removed"] == [] and delta["rescored"] == []
+    assert delta["generation"] == since + 1
+
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(8)])
+        repo.prune_changes(keep_generations=1)
+    assert client.get(f"/api/proxies/changes?since={since}").status_code == 410
+    assert client.get(f"/api/proxies/changes?since={since + 1}").json()["added"][0]["uri"] == _proxy(8).uri
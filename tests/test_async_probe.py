@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+import pytest
+
+from features.proxy_pool.infrastructure.async_probe import AsyncProbeEngine, ProbeTarget
+
+
+class StandIn:
+    """Local HTTP proxy stand-in on several ports that tracks concurrent requests."""
+
+    def __init__(self, ports: int, delay: float, hang_port_index: int = -1) -> None:
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.ports = []
+        self._count = ports
+        self._hang = hang_port_index
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    async def _start(self) -> None:
+        for index in range(self._count):
+            server = await asyncio.start_server(
+                lambda r, w, hang=(index == self._hang): self._handle(r, w, hang), "127.0.0.1", 0
+            )
+            self.ports.append(server.sockets[0].getsockname()[1])
+
+    async def _handle(self, reader, writer, hang: bool) -> None:
+        await reader.readuntil(b"\r\n\r\n")
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(60 if hang else self.delay)
+            writer.write(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.active -= 1
+            writer.close()
+
+    def close(self) -> None:
+        async def cancel_handlers() -> None:
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel_handlers(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def start(*args, **kwargs):
+        servers.append(StandIn(*args, **kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_per_host_limit_and_timeout(stand_in):
+    server = stand_in(40, delay=0.05, hang_port_index=39)
+    targets = [ProbeTarget(f"ss://p{n}", port, "same.upstream") for n, port in enumerate(server.ports)]
+    engine = AsyncProbeEngine(concurrency=100, per_host=4, timeout=0.5)
+
+    results = engine.run(targets)
+
+    assert [uri for uri, _, _ in results] == [t.uri for t in targets]
+    assert all(ok and latency > 0 for _, ok, latency in results[:-1])
+    assert results[-1][1:] == (False, None)
+    assert server.peak <= 4
+
+
+def test_global_limit_bounds_inflight_across_hosts(stand_in):
+    server = stand_in(50, delay=0.05)
+    targets = [ProbeTarget(f"ss://p{n}", port, f"host{n}") for n, port in enumerate(server.ports)]
+
+    results = AsyncProbeEngine(concurrency=10, per_host=4, timeout=2.0).run(targets)
+
+    assert all(ok for _, ok, _ in results)
+    assert 1 < server.peak <= 10
@@ -0,0 +1,35 @@
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure.candidate_cache import CandidateCache
+
+
+def _proxy(n: int) -> Proxy:
+    return Proxy(id=None, uri=f"ss://aes-128-gcm:pw@10.0.0.{n}:8388", scheme="ss", host=f"10.0.0.{n}", port=8388)
+
+
+def test_snapshot_reused_until_generation_changes(store_factory):
+    now = [0.0]
+    cache = CandidateCache(store_factory, limit=10, check_interval=5.0, clock=lambda: now[0])
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(1), _proxy(2)])
+
+    first = cache.get(0.0)
+    assert len(first.candidates) == 2
+    assert cache.get(0.0) is first
+
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(3)])
+    assert cache.get(0.0) is first
+
+    now[0] = 10.0
+    second = cache.get(0.0)
+    assert second is not first
+    assert second.generation > first.generation
+    assert len(second.candidates) == 3
+
+
+def test_health_update_bumps_generation(store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(1)])
+        before = repo.generation()
+        repo.update_health(_proxy(1).uri, True, 120.0)
+        assert repo.generation() == before + 1
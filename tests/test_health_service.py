@@ -0,0 +1,94 @@
+import sys
+import threading
+from pathlib import Path
+
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure import health_service
+from features.proxy_pool.infrastructure.health_service import GliderProxyHealthService
+from features.proxy_pool.infrastructure.port_allocator import PortAllocator
+
+
+def _proxy(n: int) -> Proxy:
+    return Proxy(id=None, uri=f"ss://aes-128-gcm:pw@10.4.0.{n}:8388", scheme="ss", host=f"10.4.0.{n}", port=8388)
+
+
+def test_concurrent_workers_probe_each_proxy_once(store_factory, monkeypatch):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(60)])
+
+    probed = []
+    lock = threading.Lock()
+
+    def fake_check(glider_bin, forward_line, port):
+        with lock:
+            probed.append(forward_line)
+        return True, 42.0
+
+    monkeypatch.setattr(health_service, "check_forward", fake_check)
+    monkeypatch.setattr(GliderProxyHealthService, "_resolve_glider_binary", lambda self: Path("glider"))
+    monkeypatch.setattr(GliderProxyHealthService, "_resolve_mihomo_binary", lambda self: None)
+    services = [GliderProxyHealthService(store_factory, worker_count=2) for _ in range(3)]
+    threads = [threading.Thread(target=service.evaluate) for service in services]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(probed) == 60
+    assert len(set(probed)) == 60
+    with store_factory() as repo:
+        assert all(p.status == "up" for p in repo.list(limit=100))
+
+
+FAKE_MIHOMO = '''#!{python}
+import http.server, json, sys, threading
+
+config = json.load(open(sys.argv[sys.argv.index("-f") + 1]))
+servers = {{p["name"]: p["server"] for p in config["proxies"]}}
+with open({log!r}, "a") as log:
+    log.write("%d\\n" % len(config["listeners"]))
+
+
+def handler(server):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(502 if server.endswith(".13") else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+for listener in config["listeners"]:
+    httpd = http.server.ThreadingHTTPServer((listener["listen"], listener["port"]), handler(servers[listener["proxy"]]))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+threading.Event().wait()
+'''
+
+
+def test_probe_host_runs_one_process_per_batch(store_factory, monkeypatch, tmp_path):
+    spawn_log = tmp_path / "spawns.log"
+    binary = tmp_path / "mihomo"
+    binary.write_text(FAKE_MIHOMO.format(python=sys.executable, log=str(spawn_log)))
+    binary.chmod(0o755)
+    unsupported = Proxy(id=None, uri="socks5://10.4.0.99:1080", scheme="socks5", host="10.4.0.99", port=1080)
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(30)] + [unsupported])
+
+    monkeypatch.setenv("MIHOMO_BIN", str(binary))
+    monkeypatch.setenv("HEALTHCHECK_BATCH_SIZE", "16")
+    monkeypatch.setattr(GliderProxyHealthService, "_resolve_glider_binary", lambda self: None)
+    ports = PortAllocator(tmp_path / "ports.lock", 31000, 31099)
+    GliderProxyHealthService(store_factory, port_allocator=ports).evaluate()
+
+    assert spawn_log.read_text().split() == ["16", "14"]
+    assert len(ports.lease(100).ports) == 100  # every listener port went back
+    with store_factory() as repo:
+        status = {p.host: p.status for p in repo.list(limit=100)}
+        assert repo.get_by_uri(unsupported.uri).last_checked is None
+    assert status["10.4.0.1"] == "up"
+    assert status["10.4.0.13"] == "unknown"
+    assert all(status[f"10.4.0.{n}"] == "up" for n in range(30) if n != 13)
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from features.proxy_pool.infrastructure import metrics
+
+
+def test_render_merges_pushed_samples():
+    registry = metrics.Registry()
+    hist = registry.register(metrics.Histogram("demo_seconds", "Demo.", ("op",), buckets=(0.1, 1.0)))
+    hits = registry.register(metrics.Counter("demo_hits", "Demo hits."))
+    hist.observe(0.05, op="list")
+    hist.observe(0.5, op="list")
+    hits.inc()
+
+    pushed = [({"source": "worker:1"}, [{"name": "demo_hits", "type": "counter", "help": "Demo hits.",
+                                          "samples": [["demo_hits_total", {}, 3.0]]}])]
+    text = metrics.render(registry.collect(), pushed, labels={"source": "api:1"})
+
+    assert text.count("# TYPE demo_hits counter") == 1
+    assert 'demo_seconds_bucket{op="list",le="0.1",source="api:1"} 1.0' in text
+    assert 'demo_seconds_bucket{op="list",le="+Inf",source="api:1"} 2.0' in text
+    assert 'demo_hits_total{source="api:1"} 1.0' in text
+    assert 'demo_hits_total{source="worker:1"} 3.0' in text
+
+
+def test_pushed_samples_expire_unless_refreshed(monkeypatch):
+    pushes = []
+
+    class _Redis:
+        def set(self, key, value, ex=None):
+            pushes.append((key, ex))
+
+    monkeypatch.setattr(metrics, "_pusher_pid", None)
+    metrics.push_to_redis(_Redis(), "worker")
+    assert pushes[0] == (f"{metrics.PUSH_KEY_PREFIX}{metrics.source('worker')}", metrics.PUSH_TTL)
+    assert metrics.PUSH_TTL <= 120
+
+    metrics.keep_pushing(_Redis, "worker", interval=0.05)
+    metrics.keep_pushing(_Redis, "worker", interval=0.05)
+    deadline = time.monotonic() + 2.0
+    while len(pushes) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(pushes) >= 4
+    assert sum(t.name == "metrics-push" for t in threading.enumerate()) == 1
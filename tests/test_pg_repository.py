@@ -0,0 +1,76 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure.db import Base, ProxyORM, build_engine, init_db
+
+# Points at a throwaway database: the schema is dropped before and after each test.
+PG_TEST_URL = os.getenv("PG_TEST_URL")
+
+pytestmark = pytest.mark.skipif(not PG_TEST_URL, reason="Requires a PostgreSQL server (set PG_TEST_URL)")
+
+
+def _proxy(n: int) -> Proxy:
+    return Proxy(id=None, uri=f"ss://aes-128-gcm:pw@10.5.{n // 250}.{n % 250}:8388", scheme="ss",
+                 host=f"10.5.{n // 250}.{n % 250}", port=8388)
+
+
+@pytest.fixture
+def pg_engine():
+    engine = build_engine(PG_TEST_URL)
+    Base.metadata.drop_all(bind=engine)
+    init_db(engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def pg_store_factory(pg_engine):
+    from features.proxy_pool.infrastructure.pg_repository import PostgresProxyRepository
+
+    factory = sessionmaker(bind=pg_engine, autocommit=False, autoflush=False)
+    return lambda: PostgresProxyRepository(session=factory())
+
+
+def test_upsert_many_merges_large_batches(pg_store_factory):
+    # Above COPY_THRESHOLD, so the psycopg driver takes the COPY + RETURNING (xmax = 0) path.
+    with pg_store_factory() as repo:
+        start = repo.generation()
+        first = repo.upsert_many([_proxy(n) for n in range(1500)])
+        assert (first.inserted, first.updated) == (1500, 0)
+        second = repo.upsert_many([_proxy(n) for n in range(1000, 2200)])
+        assert (second.inserted, second.updated) == (700, 500)
+        assert len(repo.list(limit=5000)) == 2200
+        delta = repo.changes_since(start)
+        assert {p.uri for p in delta.added} == {_proxy(n).uri for n in range(2200)}
+
+
+def test_claims_skip_locked_rows_and_record_results(pg_engine, pg_store_factory):
+    with pg_store_factory() as seed:
+        seed.upsert_many([_proxy(n) for n in range(10)])
+        locked_ids = [p.id for p in seed.list(limit=3)]
+
+    started = datetime.utcnow()
+    with pg_engine.connect() as other:
+        # Another worker mid-claim holds row locks on three proxies.
+        other.begin()
+        other.execute(select(ProxyORM.id).where(ProxyORM.id.in_(locked_ids)).with_for_update())
+        with pg_store_factory() as repo:
+            claimed = repo.claim_for_probe(10, checked_before=started)
+        other.rollback()
+    assert len(claimed) == 7
+    assert not {p.id for p in claimed} & set(locked_ids)
+
+    with pg_store_factory() as repo:
+        generation = repo.generation()
+        assert repo.record_health_batch([(p.uri, True, 80.0) for p in claimed]) == 7
+        assert repo.generation() > generation
+        assert all(repo.get_by_uri(p.uri).status == "up" for p in claimed)
+        # Recorded rows are scheduled for later; only the three skipped rows are still due.
+        again = repo.claim_for_probe(10, checked_before=datetime.utcnow())
+        assert {p.id for p in again} == set(locked_ids)
@@ -0,0 +1,97 @@
+import json
+
+from redis.exceptions import WatchError
+
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure import pool_feed
+from features.proxy_pool.infrastructure.pool_feed import PUBLISHED_STATE_KEY, RedisPoolChangePublisher, diff_pool
+
+
+def _proxy(n: int, score: float, status: str = "up") -> Proxy:
+    return Proxy(id=n, uri=f"ss://m:p@10.2.0.{n}:8388", scheme="ss", host=f"10.2.0.{n}", port=8388,
+                 score=score, status=status)
+
+
+def test_diff_pool_classifies_changes():
+    previous = {
+        _proxy(1, 0).uri: "80.0000|up",
+        _proxy(2, 0).uri: "70.0000|up",
+        _proxy(3, 0).uri: "60.0000|up",
+    }
+    added, removed, rescored = diff_pool(previous, [_proxy(1, 80.0), _proxy(2, 40.0), _proxy(4, 90.0)])
+    assert [p.uri for p in added] == [_proxy(4, 0).uri]
+    assert removed == [_proxy(3, 0).uri]
+    assert [p.uri for p in rescored] == [_proxy(2, 0).uri]
+
+
+class _RacingRedis:
+    """Redis stand-in whose published state is rewritten by a rival between WATCH and EXEC once."""
+
+    def __init__(self, rival_state):
+        self.state = {}
+        self.messages = []
+        self._rival_state = rival_state
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        assert key == PUBLISHED_STATE_KEY
+        self._queued = []
+
+    def unwatch(self):
+        pass
+
+    def hgetall(self, key):
+        return {k.encode(): v.encode() for k, v in self._redis.state.items()}
+
+    def multi(self):
+        pass
+
+    def hdel(self, key, *fields):
+        self._queued.append(lambda: [self._redis.state.pop(f, None) for f in fields])
+
+    def hset(self, key, mapping):
+        self._queued.append(lambda: self._redis.state.update(mapping))
+
+    def publish(self, channel, message):
+        self._queued.append(lambda: self._redis.messages.append(json.loads(message)))
+
+    def execute(self):
+        if self._redis._rival_state is not None:
+            self._redis.state, self._redis._rival_state = self._redis._rival_state, None
+            raise WatchError("watched key changed")
+        for apply in self._queued:
+            apply()
+
+
+class _Store:
+    def generation(self):
+        return 7
+
+    def close(self):
+        pass
+
+
+def test_publish_rediffs_after_a_concurrent_publish(monkeypatch):
+    # A rival publisher already announced proxy 1 between our read and our write.
+    redis = _RacingRedis(rival_state={_proxy(1, 0).uri: "80.0000|up"})
+    monkeypatch.setattr(pool_feed, "redis_client", lambda: redis)
+
+    RedisPoolChangePublisher(_Store).publish([_proxy(1, 80.0), _proxy(2, 70.0)])
+
+    assert len(redis.messages) == 1
+    assert [p["uri"] for p in redis.messages[0]["added"]] == [_proxy(2, 0).uri]
+    assert set(redis.state) == {_proxy(1, 0).uri, _proxy(2, 0).uri}
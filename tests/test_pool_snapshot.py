@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from features.proxy_pool.domain.models import EvictionPolicy, Proxy
+from features.proxy_pool.infrastructure.candidate_cache import CandidateCache
+from features.proxy_pool.infrastructure.pool_snapshot import (
+    MappedPoolSnapshot,
+    PoolSnapshotPublisher,
+    PoolSnapshotReader,
+    write_snapshot,
+)
+
+
+def _proxy(n: int) -> Proxy:
+    return Proxy(
+        id=None,
+        uri=f"ss://aes-128-gcm:pw@10.0.0.{n}:8388",
+        scheme="ss",
+        host=f"10.0.0.{n}",
+        port=8388,
+        label=f"节点-{n}" if n % 2 else None,
+    )
+
+
+def _seed(store_factory, count: int) -> None:
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(count)])
+        repo.record_health_batch([(_proxy(n).uri, n % 3 != 0, 10.0 * n) for n in range(count)])
+
+
+def test_snapshot_round_trips_store_listing(store_factory, tmp_path):
+    _seed(store_factory, 30)
+    path = tmp_path / "pool.snapshot"
+    PoolSnapshotPublisher(path, store_factory).publish([])
+
+    snapshot = MappedPoolSnapshot(path)
+    with store_factory() as repo:
+        assert snapshot.generation() == repo.generation()
+        assert snapshot.list_records(limit=100) == repo.list_records(limit=100)
+        assert snapshot.list_records(min_score=50.0, limit=5) == repo.list_records(min_score=50.0, limit=5)
+        first = repo.list_records(limit=7)
+        cursor = (first[-1].score, first[-1].id)
+        assert snapshot.list_records(limit=10, cursor=cursor) == repo.list_records(limit=10, cursor=cursor)
+
+
+def test_reader_remaps_replaced_file_and_old_map_stays_valid(tmp_path):
+    path = tmp_path / "pool.snapshot"
+    now = [0.0]
+    reader = PoolSnapshotReader(path, check_interval=5.0, clock=lambda: now[0])
+    assert reader.current() is None
+
+    write_snapshot(path, 1, [_proxy(1)])
+    now[0] = 10.0
+    old = reader.current()
+    assert old.generation() == 1
+
+    write_snapshot(path, 2, [_proxy(1), _proxy(2)])
+    assert reader.current() is old
+    now[0] = 20.0
+    new = reader.current()
+    assert new.generation() == 2 and len(new) == 2
+    assert old.list_records()[0].uri == _proxy(1).uri
+
+
+def test_candidate_cache_reads_store_once_snapshot_falls_behind(store_factory, tmp_path):
+    _seed(store_factory, 6)
+    path = tmp_path / "pool.snapshot"
+    with store_factory() as repo:
+        write_snapshot(path, repo.generation(), repo.list_records(limit=10)[:3])
+    reader = PoolSnapshotReader(path, check_interval=0.0)
+    cache = CandidateCache(store_factory, snapshot_source=reader.current, limit=10, check_interval=0.0)
+
+    served = [p.uri for p in cache.get(0.0).candidates]
+    assert len(served) == 3  # from the snapshot, which is current
+
+    with store_factory() as repo:
+        evicted = repo.evict_dead(EvictionPolicy(min_failures=1), now=datetime.utcnow() + timedelta(days=30))
+    assert evicted.archived == 2
+    # The snapshot was not rewritten: its generation is behind, so the store is read instead.
+    rotated = {p.uri for p in cache.get(0.0).candidates}
+    assert rotated == {_proxy(n).uri for n in (1, 2, 4, 5)}
@@ -0,0 +1,98 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from features.proxy_pool.infrastructure.port_allocator import PortAllocator
+
+HOLDER = """
+import sys
+from features.proxy_pool.infrastructure.port_allocator import PortAllocator
+
+lease = PortAllocator(sys.argv[1], 32000, 32009).lease(6)
+print(" ".join(map(str, lease.ports)), flush=True)
+sys.stdin.readline()
+"""
+
+
+def test_threads_never_share_a_port(tmp_path):
+    allocator = PortAllocator(tmp_path / "ports.lock", 32100, 32399)
+    leased, lock = [], threading.Lock()
+
+    def work():
+        for _ in range(10):
+            lease = allocator.lease(2)
+            with lock:
+                leased.extend(lease.ports)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(leased) == 160
+    assert len(set(leased)) == 160
+
+
+def test_ports_leased_by_another_process_are_skipped(tmp_path):
+    lock_path = tmp_path / "ports.lock"
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLDER, str(lock_path)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        held = {int(port) for port in holder.stdout.readline().split()}
+        assert len(held) == 6
+        allocator = PortAllocator(lock_path, 32000, 32009)
+        with allocator.lease(10) as lease:
+            assert len(lease.ports) == 4
+            assert held.isdisjoint(lease.ports)
+    finally:
+        holder.communicate("\n", timeout=10)
+
+    # The holder has exited, so the kernel dropped its leases.
+    assert len(allocator.lease(10).ports) == 10
+
+
+def test_bound_ports_are_skipped_and_released_ports_reused(tmp_path):
+    allocator = PortAllocator(tmp_path / "ports.lock", 32500, 32502)
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 32501))
+        busy.listen()
+        lease = allocator.lease(3)
+        assert lease.ports == [32500, 32502]
+    assert allocator.lease(3).ports == [32501]
+    lease.release()
+    assert sorted(allocator.lease(3).ports) == [32500, 32502]
+
+
+COLLECTOR_HOLDER = """
+import sys
+import utils
+
+print(" ".join(map(str, utils.lease_ports(6))), flush=True)
+sys.stdin.readline()
+"""
+
+
+def test_collector_leases_and_allocator_leases_are_disjoint(tmp_path):
+    pytest.importorskip("tqdm")  # imported by the collector's utils module
+    lock_path = tmp_path / "ports.lock"
+    subscribe = Path(__file__).resolve().parents[1] / "features" / "subscription_collector" / "subscribe"
+    # Overlapping but different ranges: the byte offsets must still match port for port.
+    env = {**os.environ, "PROBE_PORT_LOCK": str(lock_path), "PROBE_PORT_RANGE": "32600-32609"}
+    holder = subprocess.Popen(
+        [sys.executable, "-c", COLLECTOR_HOLDER], cwd=subscribe, env=env, stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        held = {int(port) for port in holder.stdout.readline().split()}
+        assert held == set(range(32600, 32606))
+        with PortAllocator(lock_path, 32603, 32612).lease(10) as lease:
+            assert lease.ports == list(range(32606, 32613))
+    finally:
+        holder.communicate("\n", timeout=10)
@@ -0,0 +1,40 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from features.proxy_pool.infrastructure.readiness import wait_for_listener, wait_for_listeners
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_returns_once_late_listeners_accept():
+    ports = [_free_port(), _free_port()]
+    servers = []
+
+    def open_later():
+        time.sleep(0.15)
+        for port in ports:
+            server = socket.create_server(("127.0.0.1", port))
+            servers.append(server)
+
+    threading.Thread(target=open_later).start()
+    started = time.monotonic()
+    assert wait_for_listeners("127.0.0.1", ports, timeout=5.0)
+    assert time.monotonic() - started < 1.0
+    for server in servers:
+        server.close()
+
+
+def test_gives_up_when_process_exits_or_timeout_passes():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    started = time.monotonic()
+    assert not wait_for_listener("127.0.0.1", _free_port(), timeout=5.0, proc=proc)
+    assert time.monotonic() - started < 1.0
+    assert not wait_for_listener("127.0.0.1", _free_port(), timeout=0.2)
@@ -0,0 +1,350 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, update
+
+from features.proxy_pool.domain.models import EvictionPolicy, ProbeRetention, ProbeSchedule, Proxy, ProxyRecord
+from features.proxy_pool.infrastructure.db import (
+    MIGRATIONS,
+    SCHEMA_VERSION_KEY,
+    PoolMetaORM,
+    ProbeRollupORM,
+    ProxyArchiveORM,
+    ProxyORM,
+    ProxyProbeORM,
+    init_db,
+)
+from features.proxy_pool.infrastructure.repository import ProxyRepository
+
+
+def _proxy(n: int, label: str = "") -> Proxy:
+    return Proxy(id=None, uri=f"ss://aes-128-gcm:pw@10.3.{n // 250}.{n % 250}:8388", scheme="ss",
+                 host=f"10.3.{n // 250}.{n % 250}", port=8388, label=label or None)
+
+
+def test_upsert_many_reports_inserted_and_updated(store_factory):
+    with store_factory() as repo:
+        first = repo.upsert_many([_proxy(n) for n in range(3000)])
+        assert (first.inserted, first.updated) == (3000, 0)
+
+        second = repo.upsert_many([_proxy(n, label="renamed") for n in range(2500, 3500)] + [_proxy(1)])
+        assert (second.inserted, second.updated) == (500, 501)
+        assert repo.get_by_uri(_proxy(2600).uri).label == "renamed"
+        assert len(repo.list(limit=10000)) == 3500
+
+
+def test_record_health_batch_matches_sequential_updates(store_factory):
+    probes = [(0, True, 120.0), (1, False, None), (0, True, 300.0), (2, True, 80.0), (1, False, None)]
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(3)])
+        assert repo.record_health_batch([(_proxy(n).uri, ok, lat) for n, ok, lat in probes]) == 3
+        batched = {p.uri: (p.score, p.success_count, p.fail_count, p.avg_latency_ms) for p in repo.list()}
+
+        repo.upsert_many([_proxy(n + 10) for n in range(3)])
+        for n, ok, lat in probes:
+            repo.update_health(_proxy(n + 10).uri, ok, lat)
+        sequential = {p.uri: (p.score, p.success_count, p.fail_count, p.avg_latency_ms) for p in repo.list()}
+
+    for n in range(3):
+        assert batched[_proxy(n).uri] == sequential[_proxy(n + 10).uri]
+
+
+def _query_plans(engine, calls):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        calls()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    with engine.connect() as conn:
+        return [
+            " / ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+            for sql, params in statements
+        ]
+
+
+def test_hot_queries_use_indexes(store_factory):
+    repo = store_factory()
+    engine = repo._session.get_bind()
+    repo.upsert_many([_proxy(n) for n in range(200)])
+
+    def calls():
+        repo.list(min_score=10.0, limit=20)
+        repo.list_after(min_score=10.0, limit=20, cursor=(50.0, 7))
+        repo.count_by_status()
+        repo.list_stale(datetime(2024, 1, 1), limit=20)
+
+    plans = _query_plans(engine, calls)
+    repo.close()
+    assert len(plans) == 4
+    assert "USING INDEX ix_proxies_score_id" in plans[0]
+    assert "USING INDEX ix_proxies_score_id" in plans[1]
+    assert "USING COVERING INDEX ix_proxies_status_score" in plans[2]
+    assert "USING INDEX ix_proxies_last_checked" in plans[3]
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+
+
+def test_init_db_migrates_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # Schema as created before indexes were declared on ProxyORM.
+        conn.exec_driver_sql(
+            "CREATE TABLE proxies (id INTEGER PRIMARY KEY, uri VARCHAR(2048) NOT NULL UNIQUE, "
+            "scheme VARCHAR(16) NOT NULL, host VARCHAR(255) NOT NULL, port INTEGER NOT NULL, "
+            "label VARCHAR(255), status VARCHAR(16) NOT NULL, score FLOAT NOT NULL, "
+            "success_count INTEGER NOT NULL, fail_count INTEGER NOT NULL, avg_latency_ms FLOAT NOT NULL, "
+            "last_checked DATETIME, last_ok DATETIME, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        )
+
+    init_db(engine)
+    init_db(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("proxies")}
+    assert {"lease_until", "next_due_at", "score_volatility"} <= columns
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("proxies")}
+    assert {"ix_proxies_score_id", "ix_proxies_status_score", "ix_proxies_last_checked", "ix_proxies_next_due_at"} <= indexes
+    with engine.connect() as conn:
+        version = conn.execute(
+            PoolMetaORM.__table__.select().where(PoolMetaORM.key == SCHEMA_VERSION_KEY)
+        ).one().value
+    assert version == len(MIGRATIONS)
+    engine.dispose()
+
+
+def test_compact_probes_rolls_up_once_and_expires_raw_rows(store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(2)])
+        for ok in (True, True, False):
+            repo.record_health_batch([(_proxy(0).uri, ok, 100.0), (_proxy(1).uri, False, None)])
+        later = datetime.utcnow() + timedelta(days=2)
+        retention = ProbeRetention(raw_hours=1, hourly_days=1, daily_days=30)
+
+        first = repo.compact_probes(retention, now=later)
+        again = repo.compact_probes(retention, now=later)
+
+        assert first.deleted_raw == 6
+        assert first.rolled_hourly >= 2 and first.rolled_daily >= 2
+        assert (again.rolled_hourly, again.rolled_daily, again.deleted_raw) == (0, 0, 0)
+        session = repo._session
+        assert session.query(ProxyProbeORM).count() == 0
+        assert session.query(ProbeRollupORM).filter_by(period="hour").count() == 0
+        daily = {
+            row.proxy_id: (row.probes, row.successes, row.latency_count)
+            for row in session.query(ProbeRollupORM).filter_by(period="day")
+        }
+        first_id = repo.get_by_uri(_proxy(0).uri).id
+        second_id = repo.get_by_uri(_proxy(1).uri).id
+        assert daily == {first_id: (3, 2, 3), second_id: (3, 0, 0)}
+
+
+def test_windowed_score_ignores_old_failures(store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(0)])
+        proxy_id = repo.get_by_uri(_proxy(0).uri).id
+        now = datetime.utcnow()
+        failures = [(now - timedelta(days=3), 60), (now - timedelta(hours=1), 20)]
+        repo._session.execute(
+            ProxyProbeORM.__table__.insert(),
+            [{"proxy_id": proxy_id, "ts": ts, "ok": False, "latency_ms": None} for ts, n in failures for _ in range(n)],
+        )
+        repo._session.execute(update(ProxyORM).values(fail_count=80))
+        repo._session.commit()
+        repo.compact_probes(ProbeRetention(), now=now)
+        session = repo._session
+
+        windowed = ProxyRepository(session=session, score_window_hours=2)
+        windowed.record_health_batch([(_proxy(0).uri, True, 300.0)])
+        # 1 success out of the 21 probes inside the window, whatever the lifetime counters say.
+        windowed_score = windowed.get_by_uri(_proxy(0).uri).score
+        assert windowed_score == pytest.approx(100.0 * (1 / 21) * 0.9)
+
+        lifetime = ProxyRepository(session=session, score_window_hours=0)
+        lifetime.record_health_batch([(_proxy(0).uri, True, 300.0)])
+        proxy = lifetime.get_by_uri(_proxy(0).uri)
+        assert (proxy.success_count, proxy.fail_count) == (2, 80)
+        assert proxy.score < windowed_score
+
+
+def test_evict_dead_archives_and_keeps_them_out(store_factory):
+    policy = EvictionPolicy(min_failures=5, stale_days=7, archive_retention_days=30)
+    now = datetime.utcnow()
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n, label="x" * 200) for n in range(2000)])
+        repo.record_health_batch([(_proxy(n).uri, False, None) for n in range(1500)])
+        repo._session.execute(
+            update(ProxyORM)
+            .where(ProxyORM.uri.in_([_proxy(n).uri for n in range(1500)]))
+            .values(
+                fail_count=9,
+                created_at=now - timedelta(days=30),
+                last_checked=now - timedelta(hours=1),
+                next_due_at=now + timedelta(hours=1),
+            )
+        )
+        # Failing a lot but succeeded recently: kept.
+        repo._session.execute(
+            update(ProxyORM).where(ProxyORM.uri == _proxy(0).uri).values(last_ok=now - timedelta(days=1))
+        )
+        repo._session.commit()
+        generation = repo.generation()
+
+        result = repo.evict_dead(policy, now=now)
+
+        assert result.archived == 1499
+        # Each was probed every 2 hours, three times per 6-hour HEALTHCHECK_MAX_INTERVAL.
+        assert result.probes_saved_per_cycle == 1499 * 3
+        assert result.pages_freed > 0
+        assert repo.generation() == generation + 1
+        assert len(repo.list(limit=10000)) == 501
+        assert repo._session.query(ProxyProbeORM).count() == 1
+        assert repo._session.query(ProxyArchiveORM).count() == 1499
+
+        # Still listed upstream, but archived proxies are not imported again.
+        assert repo.upsert_many([_proxy(n) for n in range(2000)]).total == 501
+
+        # A month on, the first batch ages out of the archive while proxy 0 has now gone stale too.
+        later = repo.evict_dead(policy, now=now + timedelta(days=31))
+        assert (later.archived, later.expired_archive) == (1, 1499)
+        assert repo.upsert_many([_proxy(n) for n in range(2000)]).inserted == 1499
+
+
+def test_gc_task_reports_probes_saved_per_cycle(store_factory, monkeypatch):
+    from features.proxy_pool.application import services
+    from features.proxy_pool.infrastructure import metrics, tasks
+
+    checked = datetime.utcnow() - timedelta(days=8)
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(4)])
+        dead = update(ProxyORM).values(fail_count=9, created_at=checked, last_checked=checked)
+        scheduled = dead.values(next_due_at=checked + timedelta(hours=2))
+        repo._session.execute(scheduled.where(ProxyORM.uri.in_([_proxy(0).uri, _proxy(1).uri])))
+        # Never scheduled, so due on every pass: one probe per HEALTHCHECK_MIN_INTERVAL.
+        repo._session.execute(dead.where(ProxyORM.uri == _proxy(2).uri))
+        repo._session.commit()
+    monkeypatch.setattr(services, "_store_class", store_factory)
+    monkeypatch.setattr(services, "bootstrap", lambda: None)
+    monkeypatch.setenv("POOL_SNAPSHOT_PATH", "off")
+    monkeypatch.setenv("PROXY_GC_MIN_FAILURES", "5")
+
+    result = tasks.evict_dead_proxies()
+
+    assert result["archived"] == 3
+    assert result["probes_saved_per_cycle"] == 3 + 3 + 6 * 3600 // 300
+    assert metrics.GC_PROBES_SAVED.samples() == [("proxypool_gc_probes_saved_per_cycle", {}, 78.0)]
+
+
+def test_claims_are_disjoint_until_released(store_factory):
+    start = datetime.utcnow()
+    with store_factory() as seed:
+        seed.upsert_many([_proxy(n) for n in range(10)])
+    first, second = store_factory(), store_factory()
+    try:
+        a = first.claim_for_probe(4, checked_before=start)
+        b = second.claim_for_probe(4, checked_before=start, lease_seconds=0)
+        assert len(a) == len(b) == 4
+        assert not {p.uri for p in a} & {p.uri for p in b}
+
+        first.record_health_batch([(p.uri, True, 50.0) for p in a])
+        rest = first.claim_for_probe(10, checked_before=start)
+        # Recorded rows are no longer due; the second worker's lease has already run out.
+        assert {p.uri for p in rest} == {_proxy(n).uri for n in range(10)} - {p.uri for p in a}
+        assert second.claim_for_probe(10, checked_before=start) == []
+    finally:
+        first.close()
+        second.close()
+
+
+def test_claims_follow_the_probe_schedule(store_factory):
+    schedule = ProbeSchedule(min_seconds=60, hot_seconds=600, max_seconds=36000, volatility_ref=5.0, publish_score=60.0)
+    with store_factory() as seed:
+        seed.upsert_many([_proxy(n) for n in range(4)])
+    repo = ProxyRepository(session=store_factory()._session, schedule=schedule)
+    try:
+        # 0 stays healthy, 1 keeps failing, 2 flaps; 3 is never probed.
+        for ok in (True, False, True, False, True, False):
+            repo.record_health_batch([(_proxy(0).uri, True, 50.0), (_proxy(1).uri, False, None), (_proxy(2).uri, ok, 50.0)])
+        due = {n: repo._session.get(ProxyORM, repo.get_by_uri(_proxy(n).uri).id).next_due_at for n in range(4)}
+        now = datetime.utcnow()
+        assert due[3] is None
+        # Published: no later than hot_seconds. Flapping: well short of the stable wait.
+        assert due[0] - now <= timedelta(seconds=660)
+        assert due[1] - now > timedelta(hours=5)
+        assert due[2] - now < (due[1] - now) / 2
+
+        # Only the never-probed proxy is due now; once the hot interval has passed, the published one is too.
+        assert [p.uri for p in repo.claim_for_probe(10, checked_before=now)] == [_proxy(3).uri]
+        later = now + timedelta(seconds=700)
+        claimed = repo._session.execute(repo._claim_query(10, later, later)).all()
+        assert [row.uri for row in claimed] == [_proxy(3).uri, _proxy(0).uri]
+    finally:
+        repo.close()
+
+
+def test_writes_refuse_pending_orm_changes(store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(0)])
+        row = repo._session.get(ProxyORM, repo.get_by_uri(_proxy(0).uri).id)
+        row.label = "edited outside a write"
+        with pytest.raises(RuntimeError):
+            repo.upsert_many([_proxy(1)])
+        repo._session.rollback()
+        assert repo.get_by_uri(_proxy(0).uri).label is None
+        assert repo.get_by_uri(_proxy(1).uri) is None
+
+
+def test_postgres_store_renders_native_sql():
+    from sqlalchemy.dialects import postgresql
+
+    from features.proxy_pool.infrastructure.pg_repository import PostgresProxyRepository
+
+    repo = PostgresProxyRepository.__new__(PostgresProxyRepository)
+    claim = str(repo._claim_query(10, datetime.utcnow(), datetime.utcnow()).compile(dialect=postgresql.dialect()))
+    assert claim.rstrip().endswith("FOR UPDATE SKIP LOCKED")
+    bucket = str(repo._bucket("hour", ProxyProbeORM.ts).compile(dialect=postgresql.dialect()))
+    assert bucket.startswith("date_trunc(")
+
+
+def test_list_records_match_list(store_factory):
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(50)])
+        repo.record_health_batch([(_proxy(n).uri, n % 3 != 0, 10.0 * n) for n in range(50)])
+        records = repo.list_records(min_score=1.0, limit=20, cursor=(95.0, 0))
+        assert all(isinstance(r, ProxyRecord) for r in records)
+        assert [r.to_proxy() for r in records] == repo.list_after(min_score=1.0, limit=20, cursor=(95.0, 0))
+        assert records and records[0].uri == records[0][1]
+
+
+def test_changes_since_reports_net_delta_until_pruned(store_factory):
+    now = datetime.utcnow()
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(4)])
+        start = repo.generation()
+        repo.upsert_many([_proxy(n) for n in range(6)])
+        repo.record_health_batch([(_proxy(0).uri, True, 100.0), (_proxy(4).uri, True, 100.0)])
+        repo.record_health_batch([(_proxy(0).uri, True, 100.0)])  # same score again: not rescored
+        repo._session.execute(
+            update(ProxyORM)
+            .where(ProxyORM.uri.in_([_proxy(1).uri, _proxy(5).uri]))
+            .values(last_checked=now, fail_count=20, created_at=now - timedelta(days=30))
+        )
+        repo._session.commit()
+        repo.evict_dead(EvictionPolicy(min_failures=5), now=now)
+
+        delta = repo.changes_since(start)
+        assert delta.generation == repo.generation()
+        assert [p.uri for p in delta.added] == [_proxy(4).uri]
+        assert delta.added[0].status == "up"
+        assert [p.uri for p in delta.rescored] == [_proxy(0).uri]
+        # Proxy 5 arrived and left inside the range, so the mirror never needs to hear about it.
+        assert delta.removed == [_proxy(1).uri]
+        assert repo.changes_since(delta.generation).added == []
+
+        assert repo.prune_changes(keep_generations=1) > 0
+        assert repo.changes_since(start) is None
+        assert repo.changes_since(delta.generation - 1) is not None
+        assert repo.changes_since(delta.generation + 1) is None
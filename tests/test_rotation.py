@@ -0,0 +1,89 @@
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from features.proxy_pool.application import services
+from features.proxy_pool.application.selection import AliasTable, WeightedHashRing
+from features.proxy_pool.domain.models import Proxy
+from features.proxy_pool.infrastructure.candidate_cache import CandidateCache
+
+
+def _proxy(n: int, score: float = 80.0) -> Proxy:
+    return Proxy(
+        id=None,
+        uri=f"ss://aes-128-gcm:pw@10.0.{n // 250}.{n % 250}:8388",
+        scheme="ss",
+        host=f"10.0.{n // 250}.{n % 250}",
+        port=8388,
+        score=score,
+    )
+
+
+@pytest.fixture
+def rotation(monkeypatch, store_factory):
+    counters = defaultdict(int)
+
+    def incr_token_count(token, ttl=86400, amount=1):
+        counters[token] += amount
+        return counters[token]
+
+    def incr_token_counts(increments, ttl=86400):
+        return [incr_token_count(token, amount=amount) for token, amount in increments]
+
+    with store_factory() as repo:
+        repo.upsert_many([_proxy(n) for n in range(40)])
+        for n in range(40):
+            repo.update_health(_proxy(n).uri, True, 100.0 + n)
+    monkeypatch.setattr(services, "incr_token_count", incr_token_count)
+    monkeypatch.setattr(services, "incr_token_counts", incr_token_counts)
+    monkeypatch.setattr(services, "_candidate_cache", CandidateCache(store_factory, limit=200))
+    return counters
+
+
+def test_batch_matches_sequential_single_calls(rotation):
+    singles = [services.get_rotated_proxy("alpha", rotate_every=2).uri for _ in range(7)]
+    rotation.clear()
+    picks = services.get_rotated_proxies([("alpha", 2, 3), ("alpha", 2, 4)])
+    assert [p.uri for _, _, p in picks] == singles
+
+
+def test_weighted_listing_draws_from_every_candidate(rotation, monkeypatch):
+    monkeypatch.setattr(services, "_rng", random.Random(5))
+    snapshot = services.candidate_snapshot(0.0, services.rotate_candidate_limit())
+    page = {p.uri for p in snapshot.candidates[:5]}
+    seen = set()
+    for _ in range(200):
+        seen.update(p.uri for p in services.list_proxies(limit=5, strategy="weighted"))
+    # The slowest, lowest-weighted proxy is far outside the top five yet still gets drawn.
+    assert snapshot.candidates[-1].uri in seen - page
+    assert services.candidate_snapshot(0.0, services.rotate_candidate_limit()).alias is snapshot.alias
+
+
+def test_consistent_ring_only_moves_keys_of_removed_proxy():
+    pool = [_proxy(n) for n in range(50)]
+    before = WeightedHashRing(pool)
+    removed = pool[7]
+    after = WeightedHashRing([p for p in pool if p is not removed])
+    for n in range(2000):
+        key = f"token-{n}:0"
+        old = before.pick(key)
+        if old is not removed:
+            assert after.pick(key) is old
+
+
+def test_alias_table_draws_proportionally_to_weight():
+    pool = [_proxy(n) for n in range(4)]
+    table = AliasTable(pool, [1.0, 2.0, 3.0, 4.0])
+    rng = random.Random(7)
+    hits = Counter(table.draw(rng.random(), rng.random()).uri for _ in range(40000))
+    for proxy, weight in zip(pool, [1.0, 2.0, 3.0, 4.0]):
+        assert abs(hits[proxy.uri] / 40000 - weight / 10.0) < 0.01
+
+
+def test_alias_sample_fills_k_under_skewed_weights():
+    pool = [_proxy(n) for n in range(50)]
+    table = AliasTable(pool, [1000.0] + [0.001] * 49)
+    sample = table.sample(30, random.Random(3))
+    assert sample[0].uri == pool[0].uri
+    assert len({p.uri for p in sample}) == 30